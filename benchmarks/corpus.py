@@ -0,0 +1,62 @@
+"""Deterministic synthetic corpus for the research benchmarks.
+
+Files are built from a fixed vocabulary with a Zipf-like word distribution,
+so BM25 scores, chunking and summarization see realistic term statistics and
+every run with the same seed produces byte-identical files::
+
+    python benchmarks/corpus.py /tmp/corpus --files 1000 --size-kb 8
+"""
+import argparse
+import random
+from pathlib import Path
+from typing import List
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "shi", "pra", "den", "tor", "gel", "ux", "bin", "qua", "zen"]
+EXTENSIONS = [".txt", ".md"]  # What FileSearcher indexes, so every generated file is searchable
+
+def vocabulary(size: int = 5000, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def _weights(size: int) -> List[float]:
+    return [1.0 / (rank + 1) for rank in range(size)]
+
+def _sentence(rng: random.Random, words: List[str], weights: List[float]) -> str:
+    picked = rng.choices(words, weights=weights, k=rng.randint(8, 20))
+    return " ".join(picked).capitalize() + "."
+
+def generate_corpus(root: str, files: int = 100, size_kb: int = 8, seed: int = 0) -> Path:
+    """Write ``files`` documents of about ``size_kb`` KiB each under ``root``, spread over subdirectories."""
+    root_path = Path(root)
+    rng = random.Random(seed)
+    words = vocabulary(seed=seed)
+    weights = _weights(len(words))
+    for i in range(files):
+        path = root_path / f"dir{i % 16:02d}" / f"doc{i:06d}{EXTENSIONS[i % len(EXTENSIONS)]}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines, size = [], 0
+        while size < size_kb * 1024:
+            paragraph = " ".join(_sentence(rng, words, weights) for _ in range(rng.randint(3, 6)))
+            lines.append(paragraph)
+            size += len(paragraph) + 1
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return root_path
+
+def sample_queries(count: int, seed: int = 0) -> List[str]:
+    """Two- and three-word queries drawn from the mid-frequency band of the vocabulary."""
+    rng = random.Random(seed + 1)
+    words = vocabulary(seed=seed)[50:1000]
+    return [" ".join(rng.sample(words, rng.randint(2, 3))) for _ in range(count)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--size-kb", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_corpus(args.root, args.files, args.size_kb, args.seed)
+    print(f"Wrote {args.files} files to {args.root}")
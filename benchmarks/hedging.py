@@ -0,0 +1,107 @@
+"""Tail-latency benchmark of the summarizer against a misbehaving stub endpoint.
+
+Runs ``TextSummarizer.summarize`` under a few upstream conditions — healthy,
+a slow tail on the primary model, the primary failing outright, and both
+models slower than the budget — and reports latency percentiles, how many
+calls each model received and how often the local fallback was used::
+
+    python benchmarks/hedging.py --calls 40 --budget 2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from corpus import sample_queries
+from stubs import StubServer
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+PRIMARY, FALLBACK = "openai.openai/gpt-5.2", "gpt-4"
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))] if ordered else 0.0
+
+SCENARIOS = {
+    "healthy": lambda s, args: None,
+    "slow-tail": lambda s, args: s.model_tail.__setitem__(PRIMARY, (args.tail_rate, args.tail_latency)),
+    "primary-down": lambda s, args: s.fail_models.add(PRIMARY),
+    "all-slow": lambda s, args: s.model_latency.update({PRIMARY: args.budget * 3, FALLBACK: args.budget * 3}),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.1, help="normal seconds per completion")
+    parser.add_argument("--tail-rate", type=float, default=0.15, help="fraction of slow primary calls in slow-tail")
+    parser.add_argument("--tail-latency", type=float, default=3.0)
+    parser.add_argument("--budget", type=float, default=2.0, help="summarization budget per call")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    output = Path(args.output).resolve() if args.output else None
+
+    server = StubServer(latency=args.latency).start()
+    os.environ["VELOCITY_BASE_URL"] = server.url
+    os.environ["VELOCITY_API_KEY"] = "benchmark"
+    sys.path.insert(0, str(SRC))
+    os.chdir(tempfile.mkdtemp(prefix="deep-research-hedging-"))
+
+    import metrics
+    import summarizer
+    from config import Config
+    from resilience import CircuitBreaker, LatencyTracker
+
+    texts = [f"Research data number {i} about {q}. " * 20 for i, q in enumerate(sample_queries(args.calls))]
+    results = []
+    print(f"{'scenario':<14} {'p50 s':>7} {'p95 s':>7} {'max s':>7} {'primary':>8} {'fallback':>9} {'hedged':>7} {'local':>6}")
+    try:
+        for name in args.scenarios:
+            # Calls abandoned by the previous scenario would otherwise report to this one's breaker
+            server.wait_idle()
+            server.model_tail.clear()
+            server.model_latency.clear()
+            server.fail_models.clear()
+            server.requests.clear()
+            SCENARIOS[name](server, args)
+            # Every scenario starts without history: closed circuits and no latency samples
+            summarizer.BREAKER = CircuitBreaker(Config.LLM_BREAKER_FAILURES, Config.LLM_BREAKER_COOLDOWN)
+            summarizer.LATENCY = LatencyTracker()
+            metrics.REGISTRY.reset()
+            model = summarizer.TextSummarizer(budget=args.budget)
+
+            latencies = []
+            for i, text in enumerate(texts):
+                start = time.perf_counter()
+                # The summarizer reports upstream errors on stdout; keep the table readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    model.summarize(f"{name} {text}", f"query {i}")
+                latencies.append(time.perf_counter() - start)
+            counters = metrics.REGISTRY.counters
+            row = {
+                "scenario": name,
+                "p50": round(percentile(latencies, 0.5), 3),
+                "p95": round(percentile(latencies, 0.95), 3),
+                "max": round(max(latencies), 3),
+                "primary_requests": server.requests.get(PRIMARY, 0),
+                "fallback_requests": server.requests.get(FALLBACK, 0),
+                "hedged": int(counters.get("llm.hedged", 0)),
+                "local_fallbacks": metrics.REGISTRY.histograms.get("summarize.extractive", metrics.Histogram()).count,
+            }
+            results.append(row)
+            print(f"{name:<14} {row['p50']:>7.3f} {row['p95']:>7.3f} {row['max']:>7.3f} {row['primary_requests']:>8} "
+                  f"{row['fallback_requests']:>9} {row['hedged']:>7} {row['local_fallbacks']:>6}")
+    finally:
+        server.stop()
+
+    if output:
+        output.write_text(json.dumps({"args": vars(args), "scenarios": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
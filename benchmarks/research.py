@@ -0,0 +1,180 @@
+"""End-to-end benchmark of ``Agent.research`` against local stand-ins.
+
+Web search goes to a fake DDGS client, page fetches and LLM calls to a local
+OpenAI-compatible stub server (see ``stubs.py``), and local search to a
+generated corpus (see ``corpus.py``), so runs are reproducible and offline.
+Every combination of corpus size, depth mode and cache state (cold: fresh
+caches and index; warm: the same queries again) reports p50/p95 latency and
+throughput; results are saved as JSON and can be compared with a baseline::
+
+    python benchmarks/research.py --sizes 100 1000 --output bench.json
+    python benchmarks/research.py --baseline bench.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from corpus import generate_corpus, sample_queries
+from stubs import StubServer, install_fake_ddgs
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+def max_results_for(depth, max_results):
+    # Same adjustment as the research command
+    if depth == "light":
+        return min(max_results, 3)
+    if depth == "deep":
+        return max(max_results, 10)
+    return max_results
+
+def build_agent(depth):
+    from base import Agent
+    from context import ContextPacker
+    from file_search import FileSearcher
+    from summarizer import TextSummarizer
+    from web_search import WebSearcher
+
+    deep = depth == "deep"
+    return Agent(
+        WebSearcher(fetch_pages=3 if deep else 0, fanout=3 if deep else 1),
+        FileSearcher(),
+        TextSummarizer(depth=depth),
+        verbose=False,
+        packer=ContextPacker(),
+    )
+
+def run_pass(agent, queries, corpus, max_results, concurrency):
+    import metrics
+    from batch import run_batch
+
+    metrics.REGISTRY.reset()
+    items = [{"id": i, "query": q} for i, q in enumerate(queries)]
+    start = time.perf_counter()
+    results = list(run_batch(agent, items, str(corpus), max_results, concurrency))
+    wall = time.perf_counter() - start
+    latencies = [r["elapsed"] for r in results]
+    stages = {
+        name: round(h.total, 4)
+        for name, h in sorted(metrics.REGISTRY.histograms.items(), key=lambda item: -item[1].total)
+    }
+    return {
+        "queries": len(results),
+        "errors": sum(1 for r in results if r["error"]),
+        "p50": round(percentile(latencies, 0.5), 4),
+        "p95": round(percentile(latencies, 0.95), 4),
+        "mean": round(statistics.fmean(latencies), 4) if latencies else 0.0,
+        "throughput": round(len(results) / wall, 2) if wall else 0.0,
+        "stages": stages,
+    }
+
+def compare(results, baseline, tolerance):
+    """Print p50/p95 ratios against the baseline; return the names of scenarios that regressed."""
+    previous = {s["name"]: s for s in baseline["scenarios"]}
+    regressed = []
+    print(f"\n{'scenario':<36} {'p50 ratio':>10} {'p95 ratio':>10}")
+    for scenario in results["scenarios"]:
+        old = previous.get(scenario["name"])
+        if old is None:
+            continue
+        ratios = [
+            scenario[key] / old[key] if old[key] else 1.0
+            for key in ("p50", "p95")
+        ]
+        worse = any(r > 1 + tolerance for r in ratios)
+        if worse:
+            regressed.append(scenario["name"])
+        print(f"{scenario['name']:<36} {ratios[0]:>9.2f}x {ratios[1]:>9.2f}x  {'REGRESSED' if worse else 'ok'}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="corpus sizes in files")
+    parser.add_argument("--size-kb", type=int, default=8, help="approximate size of each corpus file")
+    parser.add_argument("--depths", nargs="+", default=["light", "standard", "deep"])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--max-results", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1, help="queries in flight at once")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per stub completion")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds per streamed token")
+    parser.add_argument("--search-latency", type=float, default=0.1, help="seconds per fake DDGS call")
+    parser.add_argument("--page-latency", type=float, default=0.05, help="seconds per stub page fetch")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform +/- fraction applied to stub latencies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="keep corpora and caches here instead of a temporary directory")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a regression fails")
+    args = parser.parse_args()
+    # Scenarios chdir into their state directories, so pin user paths first
+    output = Path(args.output).resolve() if args.output else None
+    baseline = Path(args.baseline).resolve() if args.baseline else None
+
+    server = StubServer(latency=args.llm_latency, token_latency=args.token_latency,
+                        page_latency=args.page_latency, jitter=args.jitter, seed=args.seed).start()
+    install_fake_ddgs(server.url.rsplit("/", 1)[0] + "/pages", args.search_latency)
+    # Must be set before the agent's modules read their configuration
+    os.environ["VELOCITY_BASE_URL"] = server.url
+    os.environ["VELOCITY_API_KEY"] = "benchmark"
+    sys.path.insert(0, str(SRC))
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="deep-research-bench-")).resolve()
+    queries = sample_queries(args.queries, args.seed)
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "workdir")},
+        },
+        "scenarios": [],
+    }
+
+    print(f"{'scenario':<36} {'p50 s':>8} {'p95 s':>8} {'q/s':>8} {'errors':>7}")
+    try:
+        for size in args.sizes:
+            corpus = workdir / f"corpus-{size}"
+            if not corpus.exists():
+                generate_corpus(str(corpus), size, args.size_kb, args.seed)
+            for depth in args.depths:
+                # Each scenario gets its own state directory, so the first pass starts from empty caches
+                state = workdir / f"state-{size}-{depth}-{time.time_ns()}"
+                state.mkdir(parents=True)
+                os.chdir(state)
+                agent = build_agent(depth)
+                for cache_state in ("cold", "warm"):
+                    scenario = run_pass(agent, queries, corpus, max_results_for(depth, args.max_results),
+                                        args.concurrency)
+                    name = f"files={size}/depth={depth}/{cache_state}"
+                    results["scenarios"].append({
+                        "name": name, "files": size, "depth": depth, "cache": cache_state, **scenario,
+                    })
+                    print(f"{name:<36} {scenario['p50']:>8.3f} {scenario['p95']:>8.3f} "
+                          f"{scenario['throughput']:>8.2f} {scenario['errors']:>7}")
+    finally:
+        server.stop()
+
+    results["meta"]["llm_requests"] = dict(server.requests)
+    if output:
+        output.write_text(json.dumps(results, indent=2))
+    if baseline:
+        regressed = compare(results, json.loads(baseline.read_text()), args.tolerance)
+        if regressed:
+            print(f"\n{len(regressed)} scenario(s) slower than baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
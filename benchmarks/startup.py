@@ -0,0 +1,82 @@
+"""Startup-time benchmark for the CLI's lightweight commands.
+
+Runs each command in a fresh interpreter, reports the median wall time and
+fails if it exceeds the budget or if a command pulls in a module that only
+research needs (a sign an import was moved back to module level)::
+
+    python benchmarks/startup.py --runs 10 --budget-ms 400
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+COMMANDS = {
+    "--version": ["--version"],
+    "status": ["status"],
+    "config": ["config", "get", "LOCAL_SEARCH_PATH"],
+}
+
+# Modules that lightweight commands must never import
+HEAVY_MODULES = [
+    "ddgs", "openai", "httpx", "numpy", "requests", "bs4",
+    "rich.markdown", "rich.progress", "rich.prompt",
+    "base", "web_search", "file_search", "summarizer",
+]
+
+def imported_modules(args, cwd):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(SRC / "main.py"), *args],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip())
+    return modules
+
+def time_command(args, runs, cwd):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(SRC / "main.py"), *args], cwd=cwd, capture_output=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=500.0, help="Maximum median wall time per command.")
+    args = parser.parse_args()
+
+    failed = False
+    # Run from an empty directory so a local .env or cache can't skew timings
+    with tempfile.TemporaryDirectory() as cwd:
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", "pass"], cwd=cwd, capture_output=True)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{'interpreter':<12} {statistics.median(timings):8.1f} ms")
+
+        for name, command in COMMANDS.items():
+            median = statistics.median(time_command(command, args.runs, cwd))
+            heavy = sorted(m for m in HEAVY_MODULES if m in imported_modules(command, cwd))
+            status = "ok"
+            if median > args.budget_ms:
+                status = f"over budget ({args.budget_ms:.0f} ms)"
+                failed = True
+            if heavy:
+                status = f"imports {', '.join(heavy)}"
+                failed = True
+            print(f"{name:<12} {median:8.1f} ms  {status}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
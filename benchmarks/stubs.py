@@ -0,0 +1,239 @@
+"""Local stand-ins for the network services the agent talks to.
+
+``StubServer`` is an OpenAI-compatible chat completions endpoint (plain and
+SSE streaming) with configurable latency, which also serves HTML pages for
+the page fetcher. ``FakeDDGS`` replaces the ``ddgs`` client with
+deterministic results pointing at those pages, so ``WebSearcher`` runs its
+real caching, fan-out and dedup code without touching the internet.
+
+Latencies and failures can be changed while the server runs::
+
+    server = StubServer(latency=0.2).start()
+    os.environ["VELOCITY_BASE_URL"] = server.url
+    server.model_latency["gpt-4"] = 0.05
+    server.model_tail["openai.openai/gpt-5.2"] = (0.1, 3.0)  # 10% of calls take 3 s
+    server.fail_models.add("openai.openai/gpt-5.2")
+"""
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from corpus import vocabulary
+
+class StubServer:
+    def __init__(self, latency: float = 0.05, token_latency: float = 0.0, page_latency: float = 0.01,
+                 jitter: float = 0.0, completion_tokens: int = 60, seed: int = 0):
+        # Seconds before the first byte of a completion, and between streamed tokens
+        self.latency = latency
+        self.token_latency = token_latency
+        self.page_latency = page_latency
+        # Uniform +/- fraction applied to every latency
+        self.jitter = jitter
+        self.completion_tokens = completion_tokens
+        self.model_latency: Dict[str, float] = {}
+        # Per model: the fraction of calls that take the given (much longer) latency instead
+        self.model_tail: Dict[str, Tuple[float, float]] = {}
+        self.fail_models: Set[str] = set()
+        self.requests: Dict[str, int] = {}
+        self.active = 0  # Completions being served right now
+        self._rng = random.Random(seed)
+        self._words = vocabulary(500, seed)
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubServer":
+        self._httpd = _QuietServer(("127.0.0.1", 0), _handler(self))
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def _sleep(self, seconds: float):
+        if seconds <= 0:
+            return
+        with self._lock:
+            factor = 1 + self._rng.uniform(-self.jitter, self.jitter)
+        time.sleep(seconds * factor)
+
+    def _begin(self, model: str):
+        with self._lock:
+            self.requests[model] = self.requests.get(model, 0) + 1
+            self.active += 1
+
+    def _end(self):
+        with self._lock:
+            self.active -= 1
+
+    def wait_idle(self, timeout: float = 60.0):
+        """Block until no completion is being served, e.g. calls a client abandoned."""
+        deadline = time.monotonic() + timeout
+        while self.active and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def _latency(self, model: str) -> float:
+        rate, tail = self.model_tail.get(model, (0.0, 0.0))
+        with self._lock:
+            slow = self._rng.random() < rate
+        return tail if slow else self.model_latency.get(model, self.latency)
+
+    def completion_text(self, prompt: str, max_tokens: int) -> str:
+        # Deterministic per prompt, so cached and uncached runs return the same summaries
+        seed = int(hashlib.md5(prompt.encode()).hexdigest()[:8], 16)
+        rng = random.Random(seed)
+        count = min(max_tokens, self.completion_tokens)
+        return " ".join(rng.choice(self._words) for _ in range(count))
+
+    def page_html(self, page: str) -> str:
+        rng = random.Random(page)
+        paragraphs = "".join(
+            "<p>" + " ".join(rng.choice(self._words) for _ in range(40)) + ".</p>" for _ in range(20)
+        )
+        return (f"<html><head><title>Page {page}</title></head><body><nav>Home About</nav>"
+                f"<article><h1>Page {page}</h1>{paragraphs}</article><footer>Footer</footer></body></html>")
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up on slow responses is what the stub is for
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+def _handler(server: StubServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if not path.startswith("/pages/"):
+                self._send(404, b"not found", "text/plain")
+                return
+            page = path.rsplit("/", 1)[1]
+            etag = f'"{page}"'
+            server._sleep(server.page_latency)
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, b"", "text/html", {"ETag": etag})
+                return
+            self._send(200, server.page_html(page).encode(), "text/html; charset=utf-8", {"ETag": etag})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                self._send(404, b"{}", "application/json")
+                return
+            model = body.get("model", "")
+            server._begin(model)
+            try:
+                self._complete(model, body)
+            finally:
+                server._end()
+
+        def _complete(self, model: str, body: Dict):
+            server._sleep(server._latency(model))
+            if model in server.fail_models:
+                error = {"error": {"message": f"stub failure for {model}", "type": "server_error"}}
+                self._send(500, json.dumps(error).encode(), "application/json")
+                return
+
+            prompt = body["messages"][-1]["content"]
+            text = server.completion_text(prompt, body.get("max_tokens") or server.completion_tokens)
+            if body.get("stream"):
+                self._stream(model, text)
+                return
+            response = {
+                "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(text.split()),
+                    "total_tokens": len(prompt) // 4 + len(text.split()),
+                },
+            }
+            self._send(200, json.dumps(response).encode(), "application/json")
+
+        def _stream(self, model: str, text: str):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            words = text.split(" ")
+            for i, word in enumerate(words):
+                server._sleep(server.token_latency)
+                chunk = {
+                    "id": "stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    return Handler
+
+class FakeDDGS:
+    """Drop-in for ``ddgs.DDGS``: deterministic results whose links are pages on the stub server."""
+
+    page_base = "http://127.0.0.1:9/pages"
+    latency = 0.05
+    calls = 0
+    words = vocabulary(500)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def text(self, query: str, region: str = "en-us", max_results: int = 10):
+        FakeDDGS.calls += 1
+        time.sleep(self.latency)
+        digest = hashlib.md5(query.encode()).hexdigest()
+        rng = random.Random(digest)
+        domains = ["en.wikipedia.org", "github.com", "example.edu", "docs.example.org", "blog.example.com"]
+        results = []
+        for i in range(max_results):
+            page = f"{digest[:8]}-{i}"
+            results.append({
+                "title": f"{query.title()} result {i}",
+                "href": f"{self.page_base}/{page}?src={rng.choice(domains)}",
+                "body": f"{query}: " + " ".join(rng.sample(self.words, 20)),
+            })
+        return results
+
+def install_fake_ddgs(page_base: str, latency: float = 0.05):
+    """Make ``from ddgs import DDGS`` resolve to :class:`FakeDDGS`."""
+    FakeDDGS.page_base = page_base
+    FakeDDGS.latency = latency
+    module = types.ModuleType("ddgs")
+    module.DDGS = FakeDDGS
+    sys.modules["ddgs"] = module
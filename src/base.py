@@ -1,7 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional, Sequence, Union
 import os
+import asyncio
+import contextvars
 import concurrent.futures
+from context import ContextPacker
+import metrics
 
 class Searcher(ABC):
     @abstractmethod
@@ -14,31 +18,125 @@ class Summarizer(ABC):
         pass
 
 class Agent:
-    def __init__(self, web_searcher: Searcher, file_searcher: Searcher, summarizer: Summarizer):
+    def __init__(self, web_searcher: Searcher, file_searcher: Searcher, summarizer: Summarizer, verbose: bool = True,
+                 packer: ContextPacker = None):
         self.web_searcher = web_searcher
         self.file_searcher = file_searcher
         self.summarizer = summarizer
+        self.verbose = verbose
+        self.packer = packer or ContextPacker()
 
-    def research(self, topic: str, local_path: str = ".", max_results: int = 5) -> str:
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            web_future = executor.submit(self.web_searcher.search, topic, max_results) if self.web_searcher else None
-            file_future = executor.submit(self.file_searcher.search, topic, local_path, max_results) if self.file_searcher else None
-            
-            web_results = web_future.result() if web_future else []
-            file_results = file_future.result() if file_future else []
-            
-            print(f"Web search completed: {len(web_results)} results")
-            print(f"File search completed: {len(file_results)} results")
-        
-        combined_text = self._combine_results(web_results, file_results)
-        summary = self.summarizer.summarize(combined_text, topic)
-        return summary
-
-    def _combine_results(self, web: List[Dict], files: List[Dict]) -> str:
-        text = "Web Results:\n"
-        for res in web:
-            text += f"- {res.get('title', '')}: {res.get('snippet', '')}\n"
-        text += "\nFile Results:\n"
-        for res in files:
-            text += f"- {res.get('file', '')}: {res.get('content', '')}\n"
-        return text
\ No newline at end of file
+    def research(self, topic: str, local_path: Union[str, Sequence[str]] = ".", max_results: int = 5,
+                 on_stage: Optional[Callable[[str], None]] = None) -> str:
+        """Research a topic across one local root or several.
+
+        ``on_stage`` is called with "web", "file", "pack" and "summarize" as each stage is reached.
+        """
+        stage = on_stage or (lambda name: None)
+        with metrics.span("research"):
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                # Searches run in copies of this context so their spans join the caller's trace
+                web_future = executor.submit(contextvars.copy_context().run, self.web_searcher.search, topic, max_results) if self.web_searcher else None
+                file_future = executor.submit(contextvars.copy_context().run, self.file_searcher.search, topic, local_path, max_results) if self.file_searcher else None
+
+                web_results = web_future.result() if web_future else []
+                stage("web")
+                file_results = file_future.result() if file_future else []
+                stage("file")
+
+                if self.verbose:
+                    print(f"Web search completed: {len(web_results)} results")
+                    print(f"File search completed: {len(file_results)} results")
+
+            stage("pack")
+            with metrics.span("pack"):
+                combined_text = self._combine_results(web_results, file_results, topic)
+            stage("summarize")
+            summary = self.summarizer.summarize(combined_text, topic)
+            return summary
+
+    def _combine_results(self, web: List[Dict], files: List[Dict], topic: str = "") -> str:
+        return self.packer.pack(topic, web, files)
+
+class AsyncSearcher(ABC):
+    @abstractmethod
+    async def search(self, query: str, *args, **kwargs) -> List[Dict[str, Any]]:
+        pass
+
+class AsyncSummarizer(ABC):
+    @abstractmethod
+    def stream(self, text: str, query: str = "") -> AsyncIterator[str]:
+        pass
+
+    async def summarize(self, text: str, query: str = "") -> str:
+        return "".join([chunk async for chunk in self.stream(text, query)])
+
+class ThreadedSearcher(AsyncSearcher):
+    """Runs a blocking Searcher on the event loop's default thread pool."""
+
+    def __init__(self, searcher: Searcher):
+        self.searcher = searcher
+
+    async def search(self, query: str, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.searcher.search, query, *args, **kwargs)
+
+class AsyncAgent:
+    """Streaming counterpart of Agent.
+
+    By default both searches are awaited and summarized together, like
+    Agent.research. With ``incremental`` set, each search's results are
+    summarized as soon as that search finishes, while the other one is still
+    running, so the first tokens arrive after the fastest search instead of
+    after the whole pipeline, at the cost of a separate summary (and LLM call)
+    per source.
+    """
+
+    def __init__(self, web_searcher: AsyncSearcher, file_searcher: AsyncSearcher, summarizer: AsyncSummarizer,
+                 verbose: bool = True, incremental: bool = False, packer: ContextPacker = None):
+        self.web_searcher = web_searcher
+        self.file_searcher = file_searcher
+        self.summarizer = summarizer
+        self.verbose = verbose
+        self.incremental = incremental
+        self.packer = packer or ContextPacker()
+
+    async def stream(self, topic: str, local_path: Union[str, Sequence[str]] = ".", max_results: int = 5) -> AsyncIterator[str]:
+        sources = {}
+        if self.web_searcher:
+            sources[asyncio.create_task(self.web_searcher.search(topic, max_results))] = 'web'
+        if self.file_searcher:
+            sources[asyncio.create_task(self.file_searcher.search(topic, local_path, max_results))] = 'file'
+
+        pending = set(sources)
+        first_section = True
+        try:
+            if not pending:
+                async for chunk in self.summarizer.stream(self._combine_results([], [], topic), topic):
+                    yield chunk
+            while pending:
+                if self.incremental:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    done, pending = await asyncio.wait(pending)
+                results = {'web': [], 'file': []}
+                for task in done:
+                    results[sources[task]] = task.result()
+                    if self.verbose:
+                        label = 'Web' if sources[task] == 'web' else 'File'
+                        print(f"{label} search completed: {len(results[sources[task]])} results")
+
+                if not first_section:
+                    yield "\n\n"
+                first_section = False
+                # Packing scans every hit's text; off the loop, other streams sharing it keep flowing
+                combined_text = await asyncio.to_thread(self._combine_results, results['web'], results['file'], topic)
+                async for chunk in self.summarizer.stream(combined_text, topic):
+                    yield chunk
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def research(self, topic: str, local_path: Union[str, Sequence[str]] = ".", max_results: int = 5) -> str:
+        return "".join([chunk async for chunk in self.stream(topic, local_path, max_results)])
+
+    _combine_results = Agent._combine_results
@@ -0,0 +1,112 @@
+import json
+import time
+import threading
+import concurrent.futures
+from pathlib import Path
+from typing import Iterable, Iterator, Dict, Any, List, Sequence, Union
+from base import Agent, Searcher, Summarizer
+import metrics
+
+class ThrottledSearcher(Searcher):
+    """Caps how many searches run at once across every query sharing this searcher."""
+
+    def __init__(self, searcher: Searcher, limit: int):
+        self.searcher = searcher
+        self._slots = threading.BoundedSemaphore(max(1, limit))
+
+    def search(self, query: str, *args, **kwargs) -> List[Dict[str, Any]]:
+        with self._slots:
+            return self.searcher.search(query, *args, **kwargs)
+
+class ThrottledSummarizer(Summarizer):
+    """Caps how many summarizations (LLM calls) run at once."""
+
+    def __init__(self, summarizer: Summarizer, limit: int):
+        self.summarizer = summarizer
+        self._slots = threading.BoundedSemaphore(max(1, limit))
+
+    def summarize(self, text: str, query: str = "") -> str:
+        with self._slots:
+            return self.summarizer.summarize(text, query)
+
+def read_queries(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield ``{"id", "query"}`` records from a JSONL file.
+
+    The query is taken from a ``query``, ``topic`` or ``title`` field, and the
+    id from ``id`` or ``request_id``, defaulting to the line number. A line
+    that can't be used yields ``{"id", "query": None, "error"}`` instead, so
+    one bad line doesn't stop the rest of the file.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield {'id': line_no, 'query': None, 'error': f"{path}:{line_no}: invalid JSON: {e}"}
+                continue
+            if not isinstance(record, dict):
+                yield {'id': line_no, 'query': None, 'error': f"{path}:{line_no}: expected a JSON object"}
+                continue
+            query = record.get('query') or record.get('topic') or record.get('title')
+            if not query:
+                yield {
+                    'id': record.get('id', record.get('request_id', line_no)),
+                    'query': None,
+                    'error': f"{path}:{line_no}: no query, topic or title field",
+                }
+                continue
+            yield {
+                'id': record.get('id', record.get('request_id', line_no)),
+                'query': query,
+            }
+
+def run_batch(
+    agent: Agent,
+    queries: Iterable[Dict[str, Any]],
+    local_path: Union[str, Sequence[str]],
+    max_results: int = 5,
+    concurrency: int = 8,
+    profile: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Research queries concurrently, yielding one result record per query as it completes.
+
+    At most ``2 * concurrency`` queries are in flight, so arbitrarily long
+    query files are consumed lazily. With ``profile`` each record carries its
+    per-stage timings and counters.
+    """
+    def run(item: Dict[str, Any]) -> Dict[str, Any]:
+        if item.get('error'):
+            return {'id': item['id'], 'query': item['query'], 'summary': None, 'error': item['error'], 'elapsed': 0.0}
+        start = time.perf_counter()
+        with metrics.trace() as query_trace:
+            try:
+                summary = agent.research(item['query'], local_path, max_results)
+                error = None
+            except Exception as e:
+                summary = None
+                error = f"{type(e).__name__}: {e}"
+        result = {
+            'id': item['id'],
+            'query': item['query'],
+            'summary': summary,
+            'error': error,
+            'elapsed': round(time.perf_counter() - start, 3),
+        }
+        if profile:
+            result['profile'] = query_trace.summary()
+        return result
+
+    pending = set()
+    items = iter(queries)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for item in items:
+            pending.add(executor.submit(run, item))
+            if len(pending) >= concurrency * 2:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
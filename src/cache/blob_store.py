@@ -0,0 +1,117 @@
+import sqlite3
+import zlib
+import lzma
+import threading
+from pathlib import Path
+from typing import Optional
+
+CODECS = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+
+def compress(data: bytes, codec: str = "zlib") -> bytes:
+    return CODECS[codec][0](data)
+
+def decompress(data: bytes, codec: str = "zlib") -> bytes:
+    return CODECS[codec][1](data)
+
+def decompress_prefix(data: bytes, codec: str, max_bytes: int) -> bytes:
+    """At most the first ``max_bytes`` of the decompressed data, without inflating the rest."""
+    decompressor = lzma.LZMADecompressor() if codec == "lzma" else zlib.decompressobj()
+    return decompressor.decompress(data, max_bytes)
+
+def compressor(codec: str = "zlib"):
+    """An incremental compressor (``compress``/``flush``) producing the same format as :func:`compress`."""
+    if codec == "lzma":
+        return lzma.LZMACompressor(preset=6)
+    return zlib.compressobj(6)
+
+class BlobStore:
+    """Content-addressed store of compressed file contents.
+
+    Blobs are keyed by content hash, so identical files under different
+    paths are stored once; a separate table maps each path to its hash.
+    """
+
+    def __init__(self, db_path: str = ".deep_research/file_index.db", codec: str = "zlib"):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.codec = codec
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_db()
+
+    def _init_db(self):
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash TEXT PRIMARY KEY,
+                    codec TEXT,
+                    size INTEGER,
+                    data BLOB
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS paths (
+                    path TEXT PRIMARY KEY,
+                    hash TEXT
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS paths_hash ON paths (hash)")
+            # Earlier versions kept uncompressed JSON copies of every file here
+            legacy = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cache'"
+            ).fetchone()
+            if legacy:
+                self.conn.execute("DROP TABLE cache")
+        if legacy:
+            self.conn.execute("VACUUM")
+
+    def put(self, path: str, content_hash: str, data: bytes, compressed: bool = False):
+        """Map ``path`` to ``content_hash``, storing ``data`` unless that blob already exists."""
+        with self._lock:
+            exists = self.conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (content_hash,)).fetchone()
+            if not exists:
+                blob = data if compressed else compress(data, self.codec)
+                self.conn.execute(
+                    "INSERT INTO blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+                    (content_hash, self.codec, len(blob), blob)
+                )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO paths (path, hash) VALUES (?, ?)",
+                (path, content_hash)
+            )
+
+    def get(self, path: str, max_bytes: Optional[int] = None) -> Optional[str]:
+        """The content stored for ``path``, or only its first ``max_bytes`` if given."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT b.codec, b.data FROM paths p JOIN blobs b ON b.hash = p.hash WHERE p.path = ?",
+                (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        codec, blob = row
+        if max_bytes is None:
+            return decompress(blob, codec).decode('utf-8')
+        # A character cut at the limit is dropped
+        return decompress_prefix(blob, codec, max_bytes).decode('utf-8', errors='ignore')
+
+    def remove(self, path: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM paths WHERE path = ?", (path,))
+
+    def commit(self):
+        with self._lock:
+            # Drop blobs no path refers to any more
+            self.conn.execute("DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM paths)")
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
@@ -1,47 +1,205 @@
 import sqlite3
 import json
 import hashlib
+import atexit
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Any
+from typing import Optional, Any, Dict, Tuple
 import time
+import metrics
 
 class Cache:
-    def __init__(self, db_path: str = ".deep_research/cache.db"):
+    """Two-tier cache: a bounded in-process LRU in front of a single SQLite connection.
+
+    Writes are buffered and flushed in batches; the SQLite tier is kept under
+    ``max_entries`` rows by dropping entries older than ``max_age`` first and
+    then the least recently used ones.
+    """
+
+    def __init__(
+        self,
+        db_path: str = ".deep_research/cache.db",
+        memory_size: int = 1024,
+        max_entries: int = 100_000,
+        max_age: float = 7 * 24 * 3600,
+        write_batch: int = 64,
+        flush_interval: float = 5.0,
+        vacuum_interval: float = 24 * 3600,
+    ):
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         self.db_path = db_path
+        self.name = Path(db_path).stem  # Labels this cache's metrics, e.g. cache.summary_cache.hit
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.write_batch = write_batch
+        self.flush_interval = flush_interval
+        self.vacuum_interval = vacuum_interval
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._pending: Dict[str, Tuple[str, float]] = {}
+        self._touched: Dict[str, float] = {}
+        self._last_flush = time.time()
+        self._retry_at = 0.0
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self._init_db()
+        atexit.register(self.close)
 
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("""
                 CREATE TABLE IF NOT EXISTS cache (
                     key TEXT PRIMARY KEY,
                     value TEXT,
                     timestamp REAL
                 )
             """)
+            # Caches created before LRU eviction lack the access time column
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(cache)")}
+            if 'accessed' not in columns:
+                self.conn.execute("ALTER TABLE cache ADD COLUMN accessed REAL")
+                self.conn.execute("UPDATE cache SET accessed = timestamp")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value REAL)")
 
     def _get_key(self, query: str, params: dict = None) -> str:
         key_data = {"query": query, "params": params or {}}
         return hashlib.md5(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
 
+    def _remember(self, key: str, value: str, timestamp: float):
+        self._memory[key] = (value, timestamp)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
     def get(self, query: str, params: dict = None, ttl: int = 3600) -> Optional[Any]:
+        with metrics.span(f"cache.{self.name}.get"):
+            value = self._get(query, params, ttl)
+        metrics.count(f"cache.{self.name}.{'miss' if value is None else 'hit'}")
+        return value
+
+    def _get(self, query: str, params: dict, ttl: int) -> Optional[Any]:
         key = self._get_key(query, params)
-        with sqlite3.connect(self.db_path) as conn:
-            row = conn.execute(
-                "SELECT value, timestamp FROM cache WHERE key = ?",
-                (key,)
-            ).fetchone()
-            if row:
-                value, timestamp = row
-                if time.time() - timestamp < ttl:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key) or self._pending.get(key)
+            if entry is None and self.conn is not None:
+                row = self.conn.execute(
+                    "SELECT value, timestamp FROM cache WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if row:
+                    entry = row
+            if entry:
+                value, timestamp = entry
+                if now - timestamp < ttl:
+                    self._remember(key, value, timestamp)
+                    self._touched[key] = now
+                    self.hits += 1
                     return json.loads(value)
+            self.misses += 1
         return None
 
     def set(self, query: str, value: Any, params: dict = None):
         key = self._get_key(query, params)
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                "INSERT OR REPLACE INTO cache (key, value, timestamp) VALUES (?, ?, ?)",
-                (key, json.dumps(value), time.time())
-            )
\ No newline at end of file
+        entry = (json.dumps(value), time.time())
+        with self._lock:
+            self._remember(key, *entry)
+            self._pending[key] = entry
+            self._touched.pop(key, None)
+            due = len(self._pending) >= self.write_batch or entry[1] - self._last_flush >= self.flush_interval
+            if due and entry[1] >= self._retry_at:
+                try:
+                    self.flush()
+                except sqlite3.OperationalError:
+                    # e.g. another process holds the database: the batch stays pending and is retried
+                    # after flush_interval, so callers don't each wait out the lock
+                    self._retry_at = time.time() + self.flush_interval
+                    metrics.count(f"cache.{self.name}.flush_error")
+
+    def delete(self, query: str, params: dict = None):
+        key = self._get_key(query, params)
+        with self._lock:
+            self._memory.pop(key, None)
+            self._pending.pop(key, None)
+            self._touched.pop(key, None)
+            if self.conn is None:
+                return
+            with self.conn:
+                self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def flush(self):
+        with self._lock:
+            if self.conn is None:
+                return
+            now = time.time()
+            with self.conn:
+                if self._pending:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO cache (key, value, timestamp, accessed) VALUES (?, ?, ?, ?)",
+                        ((key, value, timestamp, timestamp) for key, (value, timestamp) in self._pending.items())
+                    )
+                if self._touched:
+                    self.conn.executemany(
+                        "UPDATE cache SET accessed = ? WHERE key = ?",
+                        ((accessed, key) for key, accessed in self._touched.items())
+                    )
+            self._pending.clear()
+            self._touched.clear()
+            self._last_flush = now
+            self._evict(now)
+
+    def _evict(self, now: float):
+        with self.conn:
+            deleted = self.conn.execute("DELETE FROM cache WHERE timestamp < ?", (now - self.max_age,)).rowcount
+            excess = self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+            if excess > 0:
+                deleted += self.conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                    (excess,)
+                ).rowcount
+        if deleted:
+            row = self.conn.execute("SELECT value FROM cache_meta WHERE key = 'last_vacuum'").fetchone()
+            if row is None or now - row[0] >= self.vacuum_interval:
+                self._vacuum(now)
+
+    def _vacuum(self, now: float):
+        # Opportunistic: recorded as done either way, so a busy database is retried next interval, not next flush
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache_meta (key, value) VALUES ('last_vacuum', ?)",
+                (now,)
+            )
+        # Give up at once rather than wait on another process's lock
+        self.conn.execute("PRAGMA busy_timeout = 0")
+        try:
+            self.conn.execute("VACUUM")
+        except sqlite3.OperationalError:
+            metrics.count(f"cache.{self.name}.vacuum_skipped")
+        finally:
+            self.conn.execute("PRAGMA busy_timeout = 5000")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        with self._lock:
+            if self.conn is None:
+                return
+            try:
+                self.flush()
+            except sqlite3.OperationalError:
+                pass  # Still locked by another process; buffered writes are lost, the cache stays usable
+            self.conn.close()
+            self.conn = None
@@ -5,6 +5,26 @@ load_dotenv()
 
 class Config:
     LOCAL_SEARCH_PATH = os.getenv("LOCAL_SEARCH_PATH", "./data")
+    SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", str(7 * 24 * 3600)))
+    SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "10000"))
+    SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+    SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+    # Bytes of each local hit handed to the context packer; larger files are cut to their start
+    FILE_CONTENT_LIMIT = int(os.getenv("FILE_CONTENT_LIMIT", str(256 * 1024)))
+    # Seconds an indexed root is trusted before a search rescans it in the background
+    INDEX_RESCAN_INTERVAL = float(os.getenv("INDEX_RESCAN_INTERVAL", "300"))
+    # Seconds between full scans by a watcher without file system events; each one stats the whole tree
+    INDEX_POLL_INTERVAL = float(os.getenv("INDEX_POLL_INTERVAL", "60"))
+    # Seconds a query's summarization may take before it falls back to the local extractive summary
+    SUMMARY_BUDGET = float(os.getenv("SUMMARY_BUDGET", "30"))
+    # A second model is asked once the first is slower than this quantile of its recent latencies
+    SUMMARY_HEDGE_QUANTILE = float(os.getenv("SUMMARY_HEDGE_QUANTILE", "0.9"))
+    SUMMARY_HEDGE_DELAY = float(os.getenv("SUMMARY_HEDGE_DELAY", "5"))  # Until there are enough samples
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+    LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+    # Any OpenAI-compatible endpoint, e.g. the local stub used by the benchmarks
+    VELOCITY_BASE_URL = os.getenv("VELOCITY_BASE_URL", "https://chat.velocity.online/api")
 
     @staticmethod
     def get_velocity_api_key():
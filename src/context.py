@@ -0,0 +1,129 @@
+import re
+import math
+from typing import List, Dict, Any, Tuple
+
+CHARS_PER_TOKEN = 4  # Rough average for English text; good enough for budgeting
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = frozenset("a an and are as at be by for from how in is it of on or the to what when where which who why with".split())
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+class Passage:
+    __slots__ = ('doc', 'start', 'end', 'score')
+
+    def __init__(self, doc: int, start: int, end: int, score: float):
+        self.doc = doc
+        self.start = start
+        self.end = end
+        self.score = score
+
+class ContextPacker:
+    """Builds the summarizer prompt from the passages most relevant to the query.
+
+    Web results and files are scored together: each document contributes up
+    to ``windows_per_doc`` windows of about ``window_chars`` centred on its
+    densest query-term matches, and windows are taken in relevance order
+    until ``token_budget`` is spent. Scoring is a single pass over each
+    document's tokens.
+    """
+
+    def __init__(self, token_budget: int = 3000, window_chars: int = 600, windows_per_doc: int = 2):
+        self.token_budget = token_budget
+        self.window_chars = window_chars
+        self.windows_per_doc = windows_per_doc
+
+    def _matches(self, text: str, terms: frozenset) -> List[Tuple[int, str]]:
+        return [(m.start(), m.group()) for m in TOKEN_RE.finditer(text.lower()) if m.group() in terms]
+
+    def _windows(self, doc: int, text: str, matches: List[Tuple[int, str]], weights: Dict[str, float]) -> List[Passage]:
+        if len(text) <= self.window_chars:
+            score = sum(weights[term] for term in {term for _, term in matches})
+            return [Passage(doc, 0, len(text), score)]
+        if not matches:
+            return [Passage(doc, 0, self.window_chars, 0.0)]
+
+        # Two pointers over the sorted matches: score the window that opens just before each match
+        lead = self.window_chars // 4
+        candidates = []
+        counts: Dict[str, int] = {}
+        right = 0
+        for left, (position, _) in enumerate(matches):
+            while right < len(matches) and matches[right][0] < position - lead + self.window_chars:
+                counts[matches[right][1]] = counts.get(matches[right][1], 0) + 1
+                right += 1
+            # Distinct terms dominate; repeated hits break ties
+            score = sum(weights[term] for term in counts) + 0.1 * (right - left)
+            start = max(0, min(position - lead, len(text) - self.window_chars))
+            candidates.append(Passage(doc, start, start + self.window_chars, score))
+            term = matches[left][1]
+            counts[term] -= 1
+            if not counts[term]:
+                del counts[term]
+
+        chosen: List[Passage] = []
+        for passage in sorted(candidates, key=lambda p: p.score, reverse=True):
+            if all(passage.end <= other.start or passage.start >= other.end for other in chosen):
+                chosen.append(passage)
+                if len(chosen) == self.windows_per_doc:
+                    break
+        return chosen
+
+    def _snippet(self, text: str, start: int, end: int) -> str:
+        # Widen to word boundaries so windows don't cut words in half
+        while start > 0 and not text[start - 1].isspace() and end - start < self.window_chars + 40:
+            start -= 1
+        while end < len(text) and not text[end].isspace() and end - start < self.window_chars + 80:
+            end += 1
+        snippet = " ".join(text[start:end].split())
+        return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
+
+    def pack(self, query: str, web: List[Dict[str, Any]], files: List[Dict[str, Any]]) -> str:
+        terms = frozenset(t for t in TOKEN_RE.findall(query.lower()) if t not in STOPWORDS) \
+            or frozenset(TOKEN_RE.findall(query.lower()))
+
+        # (source, label, text) per document; fetched page text follows the result's snippet
+        docs = []
+        for res in web:
+            text = res.get('snippet', '')
+            if res.get('content'):
+                text = f"{text}\n{res['content']}"
+            docs.append(('web', res.get('title', ''), text))
+        for res in files:
+            docs.append(('file', res.get('file', ''), res.get('content', '')))
+
+        all_matches = [self._matches(text, terms) for _, _, text in docs]
+        doc_freq = dict.fromkeys(terms, 0)
+        for matches in all_matches:
+            for term in {t for _, t in matches}:
+                doc_freq[term] += 1
+        weights = {term: math.log(1 + (len(docs) + 1) / (doc_freq[term] + 1)) for term in terms}
+
+        passages = []
+        for doc, (_, _, text) in enumerate(docs):
+            if text:
+                passages.extend(self._windows(doc, text, all_matches[doc], weights))
+        # Stable sort keeps original result order among equal scores
+        passages.sort(key=lambda p: p.score, reverse=True)
+
+        selected: Dict[int, List[Tuple[Passage, str]]] = {}
+        order = []
+        budget = self.token_budget
+        for passage in passages:
+            snippet = self._snippet(docs[passage.doc][2], passage.start, passage.end)
+            cost = estimate_tokens(snippet) + estimate_tokens(docs[passage.doc][1])
+            if cost > budget:
+                continue
+            budget -= cost
+            if passage.doc not in selected:
+                selected[passage.doc] = []
+                order.append(passage.doc)
+            selected[passage.doc].append((passage, snippet))
+
+        # Render grouped by source, documents ordered by their best passage, windows in text order
+        sections = {'web': ["Web Results:\n"], 'file': ["\nFile Results:\n"]}
+        for doc in order:
+            source, label, _ = docs[doc]
+            snippets = [snippet for _, snippet in sorted(selected[doc], key=lambda item: item[0].start)]
+            sections[source].append(f"- {label}: {' '.join(snippets)}\n")
+        return "".join(sections['web'] + sections['file'])
@@ -0,0 +1,67 @@
+import re
+import hashlib
+from typing import List, Dict, Any
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+TRACKING_PREFIXES = ('utm_',)
+TRACKING_PARAMS = frozenset(('fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref', 'ref_src'))
+TOKEN_RE = re.compile(r"\w+")
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so trivially different links to the same page compare equal.
+
+    Lowercases scheme and host, drops ``www.``, default ports, fragments,
+    tracking parameters and trailing slashes, and sorts the query string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'http'
+    if scheme == 'http':
+        scheme = 'https'  # Same page served both ways
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        # Exact names besides utm_*, so e.g. "reference" or "refresh" are kept
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """64-bit SimHash over word shingles; near-duplicate texts differ in few bits."""
+    tokens = TOKEN_RE.findall(text.lower())
+    features = [' '.join(tokens[i:i + shingle]) for i in range(max(1, len(tokens) - shingle + 1))]
+    weights = [0] * 64
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+def dedup_results(results: List[Dict[str, Any]], max_distance: int = 3) -> List[Dict[str, Any]]:
+    """Drop results whose canonical URL was already seen or whose snippet nearly duplicates a kept one.
+
+    Results are kept in order, so earlier (better ranked) copies win.
+    """
+    seen_urls = set()
+    fingerprints: List[int] = []
+    unique = []
+    for result in results:
+        url = canonicalize_url(result.get('link', ''))
+        if url in seen_urls:
+            continue
+        snippet = result.get('snippet', '')
+        fingerprint = simhash(snippet) if snippet else None
+        if fingerprint is not None and any(hamming(fingerprint, f) <= max_distance for f in fingerprints):
+            continue
+        seen_urls.add(url)
+        if fingerprint is not None:
+            fingerprints.append(fingerprint)
+        unique.append(result)
+    return unique
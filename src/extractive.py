@@ -0,0 +1,148 @@
+"""Offline extractive summarization: query-biased TextRank over TF-IDF sentence vectors, with MMR.
+
+The sentence-term matrix is kept in CSR form (``indptr``/``indices``/``data``
+arrays) and never densified. TextRank's similarity graph W = V Vᵀ is applied
+implicitly as two sparse products per power iteration, so scoring stays
+linear in the number of non-zero terms even for tens of thousands of
+sentences. Only the shortlisted candidates get a dense similarity matrix,
+for redundancy removal.
+"""
+import re
+import string
+import numpy as np
+from typing import List, Tuple
+
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+# Punctuation to spaces then str.split: same tokens as \w+ for ASCII text, at half the cost of a regex
+PUNCTUATION = str.maketrans({c: ' ' for c in string.punctuation})
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+class SparseMatrix:
+    """Row-normalized TF-IDF sentence vectors in CSR layout."""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, n_cols: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_rows = len(indptr) - 1
+        self.n_cols = n_cols
+        self.rows = np.repeat(np.arange(self.n_rows), np.diff(indptr))
+
+    def dot(self, x: np.ndarray) -> np.ndarray:
+        """V @ x for a dense column vector x."""
+        return np.bincount(self.rows, weights=self.data * x[self.indices], minlength=self.n_rows)
+
+    def tdot(self, y: np.ndarray) -> np.ndarray:
+        """Vᵀ @ y for a dense row-space vector y."""
+        return np.bincount(self.indices, weights=self.data * y[self.rows], minlength=self.n_cols)
+
+    def dense_rows(self, rows: np.ndarray) -> np.ndarray:
+        out = np.zeros((len(rows), self.n_cols))
+        for i, row in enumerate(rows):
+            start, end = self.indptr[row], self.indptr[row + 1]
+            out[i, self.indices[start:end]] = self.data[start:end]
+        return out
+
+def _tokenize(text: str) -> List[str]:
+    return text.lower().translate(PUNCTUATION).split()
+
+def split_sentences(text: str, min_words: int = 4) -> List[str]:
+    sentences = []
+    for sentence in SENTENCE_RE.split(text):
+        sentence = sentence.strip(" \t-•*#")
+        if len(sentence.split()) >= min_words:
+            sentences.append(sentence)
+    return sentences
+
+def _tfidf(sentences: List[str]) -> Tuple[SparseMatrix, dict]:
+    token_lists = [_tokenize(sentence) for sentence in sentences]
+    vocabulary = {}
+    cols = np.fromiter(
+        (vocabulary.setdefault(token, len(vocabulary)) for tokens in token_lists for token in tokens),
+        dtype=np.int64
+    )
+    rows = np.repeat(np.arange(len(sentences)), [len(tokens) for tokens in token_lists])
+    stop_cols = np.fromiter((vocabulary[w] for w in STOPWORDS if w in vocabulary), dtype=np.int64)
+    keep = ~np.isin(cols, stop_cols)
+
+    # Collapse (sentence, term) pairs into counts; keys sort row-major, which is CSR order
+    keys, counts = np.unique(rows[keep] * len(vocabulary) + cols[keep], return_counts=True)
+    row_of = keys // max(len(vocabulary), 1)
+    indices = keys - row_of * len(vocabulary)
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(row_of, minlength=len(sentences)))))
+
+    tf = 1.0 + np.log(counts)
+    df = np.bincount(indices, minlength=len(vocabulary))
+    idf = np.log((1 + len(sentences)) / (1 + df)) + 1.0
+    data = tf * idf[indices]
+
+    matrix = SparseMatrix(indptr, indices, data, len(vocabulary))
+    norms = np.sqrt(np.bincount(matrix.rows, weights=data * data, minlength=matrix.n_rows))
+    norms[norms == 0] = 1.0
+    matrix.data = data / norms[matrix.rows]
+    return matrix, vocabulary
+
+def _textrank(matrix: SparseMatrix, damping: float = 0.85, iterations: int = 30, tol: float = 1e-6) -> np.ndarray:
+    # Cosine graph W = V Vᵀ, column-normalized by degree; W @ r = V (Vᵀ r) is never materialized
+    n = matrix.n_rows
+    degree = matrix.dot(matrix.tdot(np.ones(n)))
+    degree[degree == 0] = 1.0
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * matrix.dot(matrix.tdot(rank / degree))
+        if np.abs(updated - rank).sum() < tol:
+            return updated
+        rank = updated
+    return rank
+
+def _query_vector(query: str, vocabulary: dict) -> np.ndarray:
+    vector = np.zeros(len(vocabulary))
+    for token in _tokenize(query):
+        col = vocabulary.get(token)
+        if col is not None:
+            vector[col] = 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _mmr(candidates: np.ndarray, relevance: np.ndarray, vectors: np.ndarray, k: int, diversity: float) -> List[int]:
+    similarity = vectors @ vectors.T
+    selected: List[int] = []
+    remaining = list(range(len(candidates)))
+    while remaining and len(selected) < k:
+        if selected:
+            redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = (1 - diversity) * relevance[remaining] - diversity * redundancy
+        best = remaining[int(np.argmax(scores))]
+        selected.append(best)
+        remaining.remove(best)
+    return [int(candidates[i]) for i in selected]
+
+def summarize(text: str, query: str = "", num_sentences: int = 3, query_weight: float = 0.7,
+              diversity: float = 0.3, shortlist: int = 5) -> str:
+    """Pick ``num_sentences`` central, query-relevant, non-redundant sentences, in document order."""
+    sentences = split_sentences(text)
+    if len(sentences) <= num_sentences:
+        return ' '.join(sentences) if sentences else text.strip()
+
+    matrix, vocabulary = _tfidf(sentences)
+    centrality = _textrank(matrix)
+    centrality = centrality / centrality.max()
+
+    query_vector = _query_vector(query, vocabulary)
+    if query_vector.any():
+        relevance = matrix.dot(query_vector)
+        if relevance.max() > 0:
+            relevance = relevance / relevance.max()
+        scores = (1 - query_weight) * centrality + query_weight * relevance
+    else:
+        scores = centrality
+
+    size = min(len(sentences), num_sentences * shortlist)
+    candidates = np.argpartition(-scores, size - 1)[:size]
+    chosen = _mmr(candidates, scores[candidates], matrix.dense_rows(candidates), num_sentences, diversity)
+    return ' '.join(sentences[i] for i in sorted(chosen))
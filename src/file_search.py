@@ -1,40 +1,301 @@
 import os
-import glob
+import re
+import codecs
+import heapq
+import contextvars
 from base import Searcher
-from typing import List, Dict, Any
-from cache.cache import Cache
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple, Union
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from cache.blob_store import BlobStore, compress, compressor
+from index.index import FileIndex, tokenize
+from config import Config
 import hashlib
+import threading
+import time
+import metrics
+
+EXTENSIONS = ('.txt', '.md')
+STREAM_THRESHOLD = 8 * 1024 * 1024  # Files larger than 8 MB are processed block by block instead of in one buffer
+BLOCK_SIZE = 1024 * 1024
+PARALLEL_THRESHOLD = 16  # Below this many changed files a process pool costs more than it saves
+TRAILING_WORD_RE = re.compile(r"\w+\Z")
+
+def _hash_file(file_path: str) -> str:
+    digest = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _ingest_stream(file_path: str, codec: str) -> Tuple[str, bytes, Dict[str, int]]:
+    """Hash, compress and count the terms of a large file without holding its content in memory."""
+    digest = hashlib.md5()
+    packer = compressor(codec)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    blob, counts, carry = [], Counter(), ""
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            digest.update(block)
+            blob.append(packer.compress(block))
+            text = carry + decoder.decode(block)
+            # A word cut by the block boundary is held back and completed by the next block
+            tail = TRAILING_WORD_RE.search(text)
+            carry = tail.group() if tail else ""
+            counts.update(tokenize(text[:len(text) - len(carry)]))
+    counts.update(tokenize(carry + decoder.decode(b'', final=True)))
+    blob.append(packer.flush())
+    return digest.hexdigest(), b''.join(blob), counts
+
+def _ingest(file_path: str, known_hash: Optional[str], codec: str) -> Tuple[str, str, Optional[bytes], Optional[Dict[str, int]]]:
+    """Hash a file and, if its content changed, compress it and count its terms.
+
+    Runs in a worker process, so it must stay a picklable module-level function.
+    """
+    if os.path.getsize(file_path) > STREAM_THRESHOLD:
+        # Hashed first, so a file whose content didn't change is only read once
+        file_hash = _hash_file(file_path)
+        if file_hash == known_hash:
+            return file_path, file_hash, None, None
+        file_hash, blob, counts = _ingest_stream(file_path, codec)
+        return file_path, file_hash, blob, counts
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    file_hash = hashlib.md5(data).hexdigest()
+    if file_hash == known_hash:
+        return file_path, file_hash, None, None
+    counts = Counter(tokenize(data.decode('utf-8')))
+    return file_path, file_hash, compress(data, codec), counts
+
+def _ingest_star(args):
+    try:
+        return _ingest(*args), None
+    except Exception as e:
+        return (args[0], None, None, None), e
 
 class FileSearcher(Searcher):
-    def __init__(self):
-        self.cache = Cache(".deep_research/file_index.db")
+    """BM25 search over local files, one index shard per root.
+
+    A root is scanned in full the first time it is searched (or ahead of time
+    by the ``index`` command); afterwards searches use the index as is and a
+    shard older than ``rescan_interval`` seconds is rescanned in the
+    background, so queries never wait on a rescan.
+    """
+
+    def __init__(self, index_dir: str = ".deep_research/index", workers: Optional[int] = None, codec: str = "zlib",
+                 rescan_interval: Optional[float] = None, content_limit: Optional[int] = None):
+        self.store = BlobStore(".deep_research/file_index.db", codec=codec)
+        self.index_dir = index_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.rescan_interval = Config.INDEX_RESCAN_INTERVAL if rescan_interval is None else rescan_interval
+        self.content_limit = content_limit or Config.FILE_CONTENT_LIMIT
+        self._indexes: Dict[str, FileIndex] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _shard_path(self, root: str) -> str:
+        name = hashlib.md5(root.encode()).hexdigest()[:16]
+        return os.path.join(self.index_dir, f"{name}.db")
+
+    def _get_index(self, root: str) -> Tuple[FileIndex, threading.Lock]:
+        # One index shard per search root (an absolute path), built and refreshed independently of the others
+        with self._lock:
+            if root not in self._indexes:
+                self._indexes[root] = FileIndex(self._shard_path(root))
+                self._locks[root] = threading.Lock()
+        return self._indexes[root], self._locks[root]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(4, self.workers))
+            return self._executor
+
+    def _map(self, fn: Callable, items: List[Any]) -> List[Any]:
+        if len(items) == 1:
+            return [fn(items[0])]
+        executor = self._get_executor()
+        futures = [executor.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def _scan(self, path: str) -> Iterator[Tuple[str, Tuple[int, int, int]]]:
+        # Same files glob's "**/*.txt" and "**/*.md" would match, stat'ed in the same pass
+        try:
+            entries = list(os.scandir(path))
+        except OSError as e:
+            print(f"Error scanning {path}: {e}")
+            return
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                if entry.is_dir():
+                    yield from self._scan(entry.path)
+                elif entry.name.endswith(EXTENSIONS) and entry.is_file():
+                    st = entry.stat()
+                    yield entry.path, (st.st_size, st.st_mtime_ns, st.st_ino)
+            except OSError as e:
+                print(f"Error reading {entry.path}: {e}")
+
+    def _refresh(self, path: str, index: FileIndex) -> Tuple[int, int]:
+        started = time.time()
+        indexed = index.documents()
+        seen = set()
+        changed = []
+        for file_path, signature in self._scan(path):
+            seen.add(file_path)
+            known_hash, known_signature = indexed.get(file_path, (None, None))
+            if known_signature != signature:
+                changed.append((file_path, signature, known_hash))
+        removed = indexed.keys() - seen
+
+        self._apply(index, changed, removed)
+        index.mark_scanned(started)
+        index.commit()
+        self.store.commit()
+        return len(changed), len(removed)
 
-    def _get_file_hash(self, file_path: str) -> str:
+    def _apply(self, index: FileIndex, changed: List[Tuple[str, Tuple[int, int, int], Optional[str]]],
+               removed: Iterable[str]):
+        metrics.count("file.changed", len(changed))
+        jobs = [(file_path, known_hash, self.store.codec) for file_path, _, known_hash in changed]
+        if len(jobs) >= PARALLEL_THRESHOLD and self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                ingested = list(executor.map(_ingest_star, jobs, chunksize=max(1, len(jobs) // (self.workers * 4))))
+        else:
+            ingested = [_ingest_star(job) for job in jobs]
+
+        for (_, signature, _), ((file_path, file_hash, blob, counts), error) in zip(changed, ingested):
+            if error is not None:
+                print(f"Error reading {file_path}: {error}")
+                continue
+            if blob is None:
+                index.touch(file_path, signature)
+                continue
+            self.store.put(file_path, file_hash, blob, compressed=True)
+            index.add(file_path, file_hash, counts, signature)
+        for file_path in removed:
+            index.remove(file_path)
+            self.store.remove(file_path)
+
+    def refresh(self, path: str) -> Tuple[int, int]:
+        """Scan ``path`` and bring its shard up to date. Returns the number of changed and removed files."""
+        root = os.path.abspath(path)
+        index, lock = self._get_index(root)
+        with lock, metrics.span("file.refresh"):
+            return self._refresh(root, index)
+
+    def update(self, path: str, file_paths: Iterable[str]) -> Tuple[int, int]:
+        """Re-check only ``file_paths`` under root ``path``, e.g. those named by file system events."""
+        index, lock = self._get_index(os.path.abspath(path))
+        changed, removed = [], []
+        with lock, metrics.span("file.update"):
+            for file_path in {os.path.abspath(file_path) for file_path in file_paths}:
+                known_hash, known_signature = index.document(file_path)
+                try:
+                    st = os.stat(file_path)
+                except FileNotFoundError:
+                    if known_hash is not None:
+                        removed.append(file_path)
+                    continue
+                signature = (st.st_size, st.st_mtime_ns, st.st_ino)
+                if signature != known_signature:
+                    changed.append((file_path, signature, known_hash))
+            self._apply(index, changed, removed)
+            index.commit()
+            self.store.commit()
+        return len(changed), len(removed)
+
+    def mark_fresh(self, path: str):
+        """Record that ``path``'s shard is current, e.g. because a watcher has been applying every change."""
+        index, lock = self._get_index(os.path.abspath(path))
+        with lock:
+            index.mark_scanned(time.time())
+            index.commit()
+
+    def _refresh_in_background(self, root: str):
+        with self._lock:
+            if root in self._refreshing:
+                return
+            self._refreshing.add(root)
+
+        def run():
+            # A connection of its own, so searches keep reading the shard while it is rewritten
+            index = FileIndex(self._shard_path(root))
+            try:
+                with metrics.span("file.refresh.background"):
+                    self._refresh(root, index)
+            except Exception as e:
+                print(f"Error refreshing {root}: {e}")
+            finally:
+                index.close()
+                with self._lock:
+                    self._refreshing.discard(root)
+
+        self._get_executor().submit(run)
+
+    def _get_content(self, file_path: str) -> str:
+        # Only the ranked hits are ever decompressed, and only as much as the packer is given
+        content = self.store.get(file_path, self.content_limit)
+        if content is not None:
+            return content
         with open(file_path, 'rb') as f:
-            return hashlib.md5(f.read()).hexdigest()
+            return f.read(self.content_limit).decode('utf-8', errors='ignore')
+
+    def search(self, query: str, path: Union[str, Sequence[str]] = "./data", max_results: int = 5) -> List[Dict[str, Any]]:
+        """Search one root or several; each root is its own shard and all are queried in parallel."""
+        # Every spelling of a root shares one shard, and its documents are stored under the absolute path
+        roots = list(dict.fromkeys(
+            os.path.abspath(root) for root in ([path] if isinstance(path, (str, os.PathLike)) else path)
+        ))
+        with metrics.span("file.search", roots=len(roots)):
+            return self._search(query, roots, max_results)
+
+    def _search(self, query: str, roots: List[str], max_results: int) -> List[Dict[str, Any]]:
+        terms = set(tokenize(query))
+
+        # Concurrent queries on one root share its index connection, so each shard is used under its lock
+        def prepare(root: str):
+            index, lock = self._get_index(root)
+            with lock:
+                last_scan = index.last_scan()
+                if last_scan is None:
+                    # Nothing to serve yet, so the first search of a root builds its shard
+                    with metrics.span("file.refresh"):
+                        self._refresh(root, index)
+                elif time.time() - last_scan > self.rescan_interval:
+                    self._refresh_in_background(root)
+                return index.statistics(terms)
+
+        def lookup(root: str):
+            index, lock = self._get_index(root)
+            with lock, metrics.span("file.query"):
+                return index.search(query, max_results, statistics)
+
+        # Score every shard against the statistics of their union, so scores compare across roots
+        shards = self._map(prepare, roots)
+        dfs = Counter()
+        for _, _, shard_dfs in shards:
+            dfs.update(shard_dfs)
+        statistics = (sum(s[0] for s in shards), sum(s[1] for s in shards), dict(dfs))
 
-    def search(self, query: str, path: str = "./data", max_results: int = 5) -> List[Dict[str, Any]]:
+        best: Dict[str, float] = {}
+        for file_path, score in (hit for hits in self._map(lookup, roots) for hit in hits):
+            # Nested roots can both return a file
+            best[file_path] = max(score, best.get(file_path, score))
+        hits = heapq.nlargest(max_results, best.items(), key=lambda item: item[1])
         results = []
-        txt_files = glob.glob(os.path.join(path, "**", "*.txt"), recursive=True)
-        md_files = glob.glob(os.path.join(path, "**", "*.md"), recursive=True)
-        all_files = txt_files + md_files
-        for file_path in all_files:
+        for file_path, score in hits:
             try:
-                mtime = os.path.getmtime(file_path)
-                file_hash = self._get_file_hash(file_path)
-                cache_key = f"file:{file_path}"
-                cached = self.cache.get(cache_key)
-                if cached and cached.get('hash') == file_hash:
-                    content = cached['content']
-                else:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    self.cache.set(cache_key, {'content': content, 'hash': file_hash})
-                if any(word in content.lower() for word in query.lower().split()):
-                    results.append({
-                        'file': file_path,
-                        'content': content[:500]  # First 500 chars
-                    })
+                content = self._get_content(file_path)
             except Exception as e:
                 print(f"Error reading {file_path}: {e}")
-        return results[:max_results]
\ No newline at end of file
+                continue
+            results.append({
+                'file': file_path,
+                'content': content,  # Agent's context packer picks the relevant windows from this prefix
+                'score': score
+            })
+        return results
@@ -0,0 +1,181 @@
+import sqlite3
+import math
+import re
+import heapq
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+class FileIndex:
+    """Persistent inverted index with BM25 scoring, stored in SQLite."""
+
+    def __init__(self, db_path: str = ".deep_research/index/default.db", k1: float = 1.5, b: float = 0.75):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_db()
+
+    def _init_db(self):
+        # WAL lets searches read while a background refresh or `index --watch` writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS docs (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE,
+                    hash TEXT,
+                    length INTEGER,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    inode INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS terms (
+                    id INTEGER PRIMARY KEY,
+                    term TEXT UNIQUE,
+                    df INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS postings (
+                    term_id INTEGER,
+                    doc_id INTEGER,
+                    tf INTEGER,
+                    PRIMARY KEY (term_id, doc_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value REAL
+                );
+                INSERT OR IGNORE INTO meta (key, value) VALUES ('doc_count', 0), ('total_length', 0);
+            """)
+            # Indexes created before stat tracking lack these columns
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(docs)")}
+            for column in ('size', 'mtime_ns', 'inode'):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE docs ADD COLUMN {column} INTEGER")
+
+    def _get_meta(self, key: str) -> float:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _add_meta(self, key: str, delta: float):
+        self.conn.execute("UPDATE meta SET value = value + ? WHERE key = ?", (delta, key))
+
+    def last_scan(self) -> Optional[float]:
+        """When the whole root was last checked for changes, or None if it never was."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'last_scan'").fetchone()
+        return row[0] if row else None
+
+    def mark_scanned(self, when: float):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_scan', ?)", (when,))
+
+    def documents(self) -> Dict[str, Tuple[str, Optional[Tuple[int, int, int]]]]:
+        """Map each indexed path to its content hash and (size, mtime_ns, inode) signature."""
+        return {
+            path: (file_hash, (size, mtime_ns, inode) if size is not None else None)
+            for path, file_hash, size, mtime_ns, inode
+            in self.conn.execute("SELECT path, hash, size, mtime_ns, inode FROM docs")
+        }
+
+    def document(self, path: str) -> Tuple[Optional[str], Optional[Tuple[int, int, int]]]:
+        row = self.conn.execute("SELECT hash, size, mtime_ns, inode FROM docs WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None, None
+        return row[0], (tuple(row[1:]) if row[1] is not None else None)
+
+    def add(self, path: str, file_hash: str, counts: Dict[str, int], signature: Tuple[int, int, int] = (None, None, None)):
+        self.remove(path)
+        length = sum(counts.values())
+        cur = self.conn.execute(
+            "INSERT INTO docs (path, hash, length, size, mtime_ns, inode) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, file_hash, length, *signature)
+        )
+        doc_id = cur.lastrowid
+        self.conn.executemany(
+            "INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+            ((term,) for term in counts)
+        )
+        self.conn.executemany(
+            "INSERT INTO postings (term_id, doc_id, tf) SELECT id, ?, ? FROM terms WHERE term = ?",
+            ((doc_id, tf, term) for term, tf in counts.items())
+        )
+        self._add_meta('doc_count', 1)
+        self._add_meta('total_length', length)
+
+    def touch(self, path: str, signature: Tuple[int, int, int]):
+        # Content is unchanged, only the stat signature moved (e.g. a `touch` or a copy)
+        self.conn.execute(
+            "UPDATE docs SET size = ?, mtime_ns = ?, inode = ? WHERE path = ?",
+            (*signature, path)
+        )
+
+    def remove(self, path: str):
+        row = self.conn.execute("SELECT id, length FROM docs WHERE path = ?", (path,)).fetchone()
+        if not row:
+            return
+        doc_id, length = row
+        self.conn.execute(
+            "UPDATE terms SET df = df - 1 WHERE id IN (SELECT term_id FROM postings WHERE doc_id = ?)",
+            (doc_id,)
+        )
+        self.conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        self.conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+        self._add_meta('doc_count', -1)
+        self._add_meta('total_length', -length)
+
+    def commit(self):
+        self.conn.execute("DELETE FROM terms WHERE df <= 0")
+        self.conn.commit()
+
+    def statistics(self, terms: Iterable[str]) -> Tuple[int, int, Dict[str, int]]:
+        """Document count, total length and the document frequency of each of ``terms``.
+
+        Summed over several shards these give collection-wide BM25 statistics.
+        """
+        dfs = {}
+        for term in set(terms):
+            row = self.conn.execute("SELECT df FROM terms WHERE term = ?", (term,)).fetchone()
+            if row:
+                dfs[term] = row[0]
+        return int(self._get_meta('doc_count')), int(self._get_meta('total_length')), dfs
+
+    def search(self, query: str, k: int = 5,
+               statistics: Optional[Tuple[int, int, Dict[str, int]]] = None) -> List[Tuple[str, float]]:
+        """Top ``k`` documents by BM25, scored with ``statistics`` (see above) when given instead of this shard's own."""
+        terms = set(tokenize(query))
+        if statistics is None:
+            statistics = self.statistics(terms)
+        doc_count, total_length, dfs = statistics
+        if not doc_count:
+            return []
+        avg_length = total_length / doc_count or 1.0
+
+        scores: Dict[int, float] = {}
+        for term in terms:
+            row = self.conn.execute("SELECT id, df FROM terms WHERE term = ?", (term,)).fetchone()
+            if not row:
+                continue
+            term_id, df = row[0], dfs.get(term, row[1])
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            postings = self.conn.execute(
+                "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id WHERE p.term_id = ?",
+                (term_id,)
+            )
+            for doc_id, tf, length in postings:
+                norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        results = []
+        for doc_id, score in top:
+            path = self.conn.execute("SELECT path FROM docs WHERE id = ?", (doc_id,)).fetchone()[0]
+            results.append((path, score))
+        return results
+
+    def close(self):
+        self.conn.close()
@@ -1,26 +1,24 @@
 import typer
-from typing import Optional, List
+import contextlib
+from typing import Optional, List, Union, TYPE_CHECKING
 from pathlib import Path
 from rich.console import Console
-from rich.markdown import Markdown
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeRemainingColumn
-from rich.panel import Panel
-from rich.text import Text
-from rich.prompt import Prompt
-from base import Agent
-from web_search import WebSearcher
-from file_search import FileSearcher
-from summarizer import TextSummarizer
 from config import Config
 
+# Search, summarization and most of Rich are imported inside the commands that
+# use them, so --version, config and status start without loading them
+if TYPE_CHECKING:
+    from base import AsyncAgent
+
 app = typer.Typer(
     help="🔍 Deep Research Agent - Search web and local files for comprehensive insights.",
     add_completion=False,
 )
 console = Console()
 
-@app.callback()
+@app.callback(invoke_without_command=True)
 def callback(
+    ctx: typer.Context,
     version: bool = typer.Option(False, "--version", "-v", help="Show version and exit.")
 ):
     """
@@ -33,6 +31,13 @@ def callback(
         console.print("Built with ❤️ using Python and AI")
         raise typer.Exit()
 
+    # Batch output and stats exports go to stdout, keep them clean
+    if ctx.invoked_subcommand in ("research-batch", "stats"):
+        return
+
+    from rich.panel import Panel
+    from rich.text import Text
+
     # Welcome message
     welcome_text = Text("🔍 Deep Research Agent", style="bold magenta")
     welcome_panel = Panel(
@@ -54,15 +59,60 @@ def research(
     format: str = typer.Option("md", help="📄 Output format: md or json."),
     output: Optional[Path] = typer.Option(None, help="💾 Output file path."),
     verbose: bool = typer.Option(False, help="📢 Enable verbose output."),
+    stream: bool = typer.Option(False, help="⚡ Stream the summary token by token."),
+    incremental: bool = typer.Option(False, help="🧩 With --stream, summarize each source as soon as its search finishes (one LLM call per source)."),
+    profile: bool = typer.Option(False, help="⏱️  Print per-stage timings for each query."),
+    chunk_tokens: int = typer.Option(Config.SUMMARY_CHUNK_TOKENS, help="🧩 Token budget per summarization chunk."),
+    map_concurrency: int = typer.Option(Config.SUMMARY_MAP_CONCURRENCY, help="🧵 Chunks summarized at once."),
+    fetch_pages: Optional[int] = typer.Option(None, help="📄 Fetch full text of the top N web results (default: 3 in deep mode, else 0)."),
+    fanout: Optional[int] = typer.Option(None, help="🔀 Query variants searched and merged (default: 3 in deep mode, else 1)."),
+    context_tokens: int = typer.Option(Config.CONTEXT_TOKEN_BUDGET, help="📦 Token budget for the packed search context."),
+    budget: float = typer.Option(Config.SUMMARY_BUDGET, help="⏳ Seconds summarization may take before falling back to a local summary."),
 ):
     """
     🔬 Perform deep research on queries interactively.
 
     Enter your research queries one by one. Type 'quit' to exit.
     """
+    from rich.markdown import Markdown
+    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeRemainingColumn
+    from rich.prompt import Prompt
+    from base import Agent, AsyncAgent, ThreadedSearcher
+    from context import ContextPacker
+    from web_search import WebSearcher
+    from file_search import FileSearcher
+    from summarizer import TextSummarizer, AsyncTextSummarizer, get_summary_cache
+    import metrics
+
     console.print("\n[bold cyan]🚀 Starting Interactive Research Mode[/bold cyan]")
     console.print("[dim]Type your queries below. Enter 'quit' to exit.[/dim]\n")
-    
+
+    # Components, their caches and the LLM client are built once and reused for every query
+    with console.status("🔧 Initializing components...", spinner="dots") if verbose else contextlib.nullcontext():
+        web_searcher = WebSearcher(
+            fetch_pages=_deep_default(depth, fetch_pages, 0),
+            fanout=_deep_default(depth, fanout, 1),
+        ) if web else None
+        file_searcher = FileSearcher() if local else None
+        summary_cache = get_summary_cache()
+        if stream:
+            # One loop for the whole session: the async HTTP client is bound to it
+            import asyncio
+            loop = asyncio.new_event_loop()
+            stream_agent = AsyncAgent(
+                ThreadedSearcher(web_searcher) if web_searcher else None,
+                ThreadedSearcher(file_searcher) if file_searcher else None,
+                AsyncTextSummarizer(depth=depth, cache=summary_cache, chunk_tokens=chunk_tokens,
+                                    map_concurrency=map_concurrency, budget=budget),
+                verbose=verbose,
+                incremental=incremental,
+                packer=ContextPacker(token_budget=context_tokens),
+            )
+        else:
+            summarizer = TextSummarizer(depth=depth, cache=summary_cache, chunk_tokens=chunk_tokens,
+                                        map_concurrency=map_concurrency, budget=budget)
+            agent = Agent(web_searcher, file_searcher, summarizer, packer=ContextPacker(token_budget=context_tokens))
+
     while True:
         try:
             query = Prompt.ask("[bold green]Query[/bold green]").strip()
@@ -85,6 +135,28 @@ def research(
         elif depth == "deep":
             adjusted_max_results = max(max_results, 10)
 
+        if stream:
+            local_path = [str(p) for p in paths] if paths else Config.LOCAL_SEARCH_PATH
+            try:
+                with metrics.trace() as query_trace:
+                    loop.run_until_complete(
+                        _stream_research(stream_agent, query, local_path, adjusted_max_results, format, output)
+                    )
+            except KeyboardInterrupt:
+                console.print("\n[red]⏹️  Research interrupted by user.[/red]")
+                continue
+            except Exception as e:
+                # e.g. the connection dropped after part of the answer was shown; the session carries on
+                from rich.markup import escape
+                console.print(f"\n[red]❌ Streaming failed: {escape(f'{type(e).__name__}: {e}')}[/red]")
+            if profile:
+                _print_profile(query_trace)
+            if verbose:
+                _print_cache_stats(summary_cache)
+            console.print("\n" + "═" * 60)
+            console.print("[dim]Ready for next query...[/dim]\n")
+            continue
+
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -94,24 +166,23 @@ def research(
             console=console,
             disable=not verbose,
         ) as progress:
-            init_task = progress.add_task("🔧 Initializing components...", total=None)
-            
-            # Initialize components
-            web_searcher = WebSearcher() if web else None
-            file_searcher = FileSearcher() if local else None
-            summarizer = TextSummarizer(depth=depth)
+            search_task = progress.add_task("🔍 Searching sources...", total=100)
+            stages = {
+                "web": (35, "🌐 Web search done, waiting for files..."),
+                "file": (55, "📁 File search done"),
+                "pack": (60, "📦 Packing context..."),
+                "summarize": (70, "🤖 Summarizing..."),
+            }
 
-            agent = Agent(web_searcher, file_searcher, summarizer)
-            
-            progress.update(init_task, description="✅ Components ready")
-            progress.remove_task(init_task)
+            def on_stage(name: str):
+                completed, description = stages[name]
+                progress.update(search_task, completed=completed, description=description)
 
-            search_task = progress.add_task("🔍 Searching sources...", total=100)
-            
             # Perform research
             try:
-                local_path = str(paths[0]) if paths else Config.LOCAL_SEARCH_PATH
-                summary = agent.research(query, local_path, adjusted_max_results)
+                local_path = [str(p) for p in paths] if paths else Config.LOCAL_SEARCH_PATH
+                with metrics.trace() as query_trace:
+                    summary = agent.research(query, local_path, adjusted_max_results, on_stage=on_stage)
                 progress.update(search_task, completed=100)
             except KeyboardInterrupt:
                 console.print("\n[red]⏹️  Research interrupted by user.[/red]")
@@ -140,10 +211,294 @@ def research(
                 console.print("[red]❌ Unsupported format.[/red]")
 
             progress.remove_task(search_task)
-        
+
+        if profile:
+            _print_profile(query_trace)
+        if verbose:
+            _print_cache_stats(summary_cache)
         console.print("\n" + "═" * 60)
         console.print("[dim]Ready for next query...[/dim]\n")
 
+    # Add this session's timings to the totals shown by `stats`
+    metrics.persist()
+
+def _deep_default(depth: str, value: Optional[int], default: int) -> int:
+    # Options left unset widen to 3 in deep mode
+    if value is not None:
+        return value
+    return 3 if depth == "deep" else default
+
+def _print_cache_stats(cache, target: Optional[Console] = None):
+    stats = cache.stats()
+    (target or console).print(
+        f"[dim]🗄️  Summary cache: {stats['hits']} hits, {stats['misses']} misses "
+        f"({stats['hit_rate']:.0%} hit rate)[/dim]"
+    )
+
+def _print_profile(query_trace, target: Optional[Console] = None):
+    from rich.table import Table
+
+    summary = query_trace.summary()
+    table = Table(title="⏱️  Query profile", title_justify="left")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total (ms)", justify="right")
+    for name, stage in sorted(summary["stages"].items(), key=lambda item: -item[1]["total"]):
+        table.add_row(name, str(stage["count"]), f"{stage['total'] * 1000:.1f}")
+    (target or console).print(table)
+    if summary["counters"]:
+        counters = ", ".join(f"{name}={value:g}" for name, value in sorted(summary["counters"].items()))
+        (target or console).print(f"[dim]{counters}[/dim]")
+
+async def _stream_research(agent: "AsyncAgent", query: str, local_path: Union[str, List[str]], max_results: int,
+                           format: str, output: Optional[Path]):
+    from rich.markdown import Markdown
+
+    if format not in ("md", "json"):
+        console.print("[red]❌ Unsupported format.[/red]")
+        return
+
+    chunks = []
+    out = output.open("w", encoding="utf-8") if output and format == "md" else None
+    try:
+        if format == "md":
+            header = f"# 🔍 Research Summary: {query}\n\n"
+            console.print(Markdown(header))
+            if out:
+                out.write(header)
+        async for chunk in agent.stream(query, local_path, max_results):
+            chunks.append(chunk)
+            if format == "md":
+                console.print(chunk, end="", markup=False, highlight=False, soft_wrap=True)
+                if out:
+                    out.write(chunk)
+                    out.flush()
+    finally:
+        if out:
+            out.close()
+
+    if format == "json":
+        import json
+        output_text = json.dumps({"query": query, "summary": "".join(chunks)}, indent=2)
+        if output:
+            output.write_text(output_text)
+        else:
+            console.print(output_text)
+    if output:
+        console.print(f"\n💾 [green]Output saved to {output}[/green]")
+
+@app.command("research-batch")
+def research_batch(
+    input: Path = typer.Argument(..., help="📥 JSONL file of queries (query, topic or title field per line)."),
+    web: bool = typer.Option(True, help="🌐 Enable web search."),
+    local: bool = typer.Option(True, help="📁 Enable local file search."),
+    paths: List[Path] = typer.Option([Path("./data")], help="📂 Paths to search locally."),
+    max_results: int = typer.Option(5, help="🔢 Maximum results per source."),
+    depth: str = typer.Option("standard", help="📊 Depth mode: light, standard, or deep."),
+    output: Optional[Path] = typer.Option(None, help="💾 JSONL output file (default: stdout)."),
+    concurrency: int = typer.Option(8, help="🧵 Queries researched at once."),
+    web_limit: int = typer.Option(4, help="🌐 Concurrent web searches."),
+    file_limit: int = typer.Option(2, help="📁 Concurrent local file searches."),
+    llm_limit: int = typer.Option(4, help="🤖 Concurrent summarization calls."),
+    profile: bool = typer.Option(False, help="⏱️  Include per-stage timings in each result."),
+    chunk_tokens: int = typer.Option(Config.SUMMARY_CHUNK_TOKENS, help="🧩 Token budget per summarization chunk."),
+    map_concurrency: int = typer.Option(Config.SUMMARY_MAP_CONCURRENCY, help="🧵 Chunks summarized at once, shared by all queries in the batch."),
+    fetch_pages: Optional[int] = typer.Option(None, help="📄 Fetch full text of the top N web results (default: 3 in deep mode, else 0)."),
+    fanout: Optional[int] = typer.Option(None, help="🔀 Query variants searched and merged (default: 3 in deep mode, else 1)."),
+    context_tokens: int = typer.Option(Config.CONTEXT_TOKEN_BUDGET, help="📦 Token budget for the packed search context."),
+    budget: float = typer.Option(Config.SUMMARY_BUDGET, help="⏳ Seconds summarization may take before falling back to a local summary."),
+):
+    """
+    📦 Research every query in a JSONL file concurrently.
+
+    Writes one JSON result per line as each query completes.
+    """
+    import sys
+    import json
+    import time
+    from base import Agent
+    from context import ContextPacker
+    from web_search import WebSearcher
+    from file_search import FileSearcher
+    from summarizer import TextSummarizer, get_summary_cache
+    from batch import ThrottledSearcher, ThrottledSummarizer, read_queries, run_batch
+    import metrics
+
+    err_console = Console(stderr=True)
+    if not input.exists():
+        err_console.print(f"[red]❌ Input file not found: {input}[/red]")
+        raise typer.Exit(1)
+
+    adjusted_max_results = max_results
+    if depth == "light":
+        adjusted_max_results = min(max_results, 3)
+    elif depth == "deep":
+        adjusted_max_results = max(max_results, 10)
+
+    # Components are shared by every query; the wrappers bound each stage's concurrency
+    web_searcher = ThrottledSearcher(WebSearcher(
+        fetch_pages=_deep_default(depth, fetch_pages, 0),
+        fanout=_deep_default(depth, fanout, 1),
+    ), web_limit) if web else None
+    file_searcher = ThrottledSearcher(FileSearcher(), file_limit) if local else None
+    summary_cache = get_summary_cache()
+    summarizer = ThrottledSummarizer(
+        TextSummarizer(depth=depth, cache=summary_cache, chunk_tokens=chunk_tokens,
+                       map_concurrency=map_concurrency, budget=budget),
+        llm_limit
+    )
+    agent = Agent(web_searcher, file_searcher, summarizer, verbose=False,
+                  packer=ContextPacker(token_budget=context_tokens))
+    local_path = [str(p) for p in paths] if paths else Config.LOCAL_SEARCH_PATH
+
+    out = open(output, 'w', encoding='utf-8') if output else sys.stdout
+    processed = failed = 0
+    start = time.perf_counter()
+    try:
+        # Components report errors with print(); on stdout they would corrupt the JSONL stream
+        with contextlib.redirect_stdout(sys.stderr):
+            for result in run_batch(agent, read_queries(input), local_path, adjusted_max_results, concurrency, profile):
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                processed += 1
+                failed += result['error'] is not None
+    except ValueError as e:
+        err_console.print(f"[red]❌ {e}[/red]")
+        raise typer.Exit(1)
+    finally:
+        if output:
+            out.close()
+        metrics.persist()
+
+    err_console.print(
+        f"[green]✅ Processed {processed} queries ({failed} failed) "
+        f"in {time.perf_counter() - start:.1f}s[/green]"
+    )
+    _print_cache_stats(summary_cache, err_console)
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", help="🖥️  Interface to listen on."),
+    port: int = typer.Option(8765, help="🔌 Port to listen on."),
+    web: bool = typer.Option(True, help="🌐 Enable web search."),
+    local: bool = typer.Option(True, help="📁 Enable local file search."),
+    paths: List[Path] = typer.Option([Path("./data")], help="📂 Roots served for local search (requests may pick among them)."),
+    max_results: int = typer.Option(5, help="🔢 Default maximum results per source."),
+    depth: str = typer.Option("standard", help="📊 Depth mode: light, standard, or deep."),
+    concurrency: int = typer.Option(4, help="🧵 Research runs executed at once."),
+    queue_size: int = typer.Option(32, help="📥 Runs allowed to wait before requests get 503."),
+    timeout: float = typer.Option(300.0, help="⏲️  Seconds a request waits for its result."),
+    watch: bool = typer.Option(False, help="👀 Keep the local index current as files change."),
+    verbose: bool = typer.Option(False, help="📢 Log every request."),
+    fetch_pages: Optional[int] = typer.Option(None, help="📄 Fetch full text of the top N web results (default: 3 in deep mode, else 0)."),
+    fanout: Optional[int] = typer.Option(None, help="🔀 Query variants searched and merged (default: 3 in deep mode, else 1)."),
+    context_tokens: int = typer.Option(Config.CONTEXT_TOKEN_BUDGET, help="📦 Token budget for the packed search context."),
+    budget: float = typer.Option(Config.SUMMARY_BUDGET, help="⏳ Seconds summarization may take before falling back to a local summary."),
+):
+    """
+    🛰️  Serve research over a local HTTP/JSON API.
+
+    POST /research {"query": ..., "stream": true} returns the summary (or NDJSON events);
+    GET /health and GET /stats report on the server.
+    """
+    import threading
+    import metrics
+    from base import AsyncAgent, ThreadedSearcher
+    from context import ContextPacker
+    from web_search import WebSearcher
+    from file_search import FileSearcher
+    from summarizer import AsyncTextSummarizer, get_summary_cache
+    from server import ResearchService, create_server
+
+    roots = [str(p) for p in paths] if paths else [Config.LOCAL_SEARCH_PATH]
+    if depth == "light":
+        max_results = min(max_results, 3)
+    elif depth == "deep":
+        max_results = max(max_results, 10)
+
+    # Built once and kept warm for every request
+    with console.status("🔧 Initializing components...", spinner="dots"):
+        web_searcher = WebSearcher(
+            fetch_pages=_deep_default(depth, fetch_pages, 0),
+            fanout=_deep_default(depth, fanout, 1),
+        ) if web else None
+        file_searcher = FileSearcher() if local else None
+        if file_searcher:
+            for root in roots:
+                if Path(root).is_dir():
+                    file_searcher.refresh(root)
+        agent = AsyncAgent(
+            ThreadedSearcher(web_searcher) if web_searcher else None,
+            ThreadedSearcher(file_searcher) if file_searcher else None,
+            AsyncTextSummarizer(depth=depth, cache=get_summary_cache(), budget=budget),
+            verbose=False,
+            incremental=False,
+            packer=ContextPacker(token_budget=context_tokens),
+        )
+        service = ResearchService(agent, roots, max_results, concurrency, queue_size)
+        httpd = create_server(service, host, port, timeout, verbose)
+
+    watcher = None
+    if watch and file_searcher:
+        from watch import Watcher
+        watcher = Watcher(file_searcher, [root for root in roots if Path(root).is_dir()])
+        threading.Thread(target=watcher.run, daemon=True).start()
+
+    console.print(f"[bold cyan]🛰️  Serving on http://{host}:{port}[/bold cyan] [dim](Ctrl+C to stop)[/dim]")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n[yellow]👋 Shutting down...[/yellow]")
+    finally:
+        httpd.server_close()
+        if watcher:
+            watcher.stop()
+        service.close()
+        metrics.persist()
+
+@app.command()
+def index(
+    paths: Optional[List[Path]] = typer.Argument(None, help="📂 Paths to index (default: LOCAL_SEARCH_PATH)."),
+    watch: bool = typer.Option(False, help="👀 Keep running and apply file changes as they happen."),
+    interval: float = typer.Option(2.0, help="⏲️  Seconds between applying file system events."),
+    poll_interval: float = typer.Option(Config.INDEX_POLL_INTERVAL, help="🔁 Seconds between full scans when file events are unavailable."),
+):
+    """
+    🗂️  Build or refresh the local search index ahead of time.
+    """
+    import time
+    import metrics
+    from file_search import FileSearcher
+
+    roots = [str(p) for p in paths] if paths else [Config.LOCAL_SEARCH_PATH]
+    searcher = FileSearcher()
+    try:
+        for root in roots:
+            if not Path(root).is_dir():
+                console.print(f"[yellow]⚠️  Skipping {root}: not a directory[/yellow]")
+                continue
+            start = time.perf_counter()
+            with console.status(f"🗂️  Indexing {root}...", spinner="dots"):
+                changed, removed = searcher.refresh(root)
+            console.print(f"[green]✅ {root}[/green]: {changed} updated, {removed} removed "
+                          f"[dim]({time.perf_counter() - start:.1f}s)[/dim]")
+
+        if watch:
+            from watch import Watcher
+
+            watcher = Watcher(searcher, [root for root in roots if Path(root).is_dir()], interval, poll_interval)
+            console.print(f"\n[bold cyan]👀 Watching for changes ({watcher.mode}). Press Ctrl+C to stop.[/bold cyan]")
+
+            def on_change(root: str, changed: int, removed: int):
+                console.print(f"[dim]{time.strftime('%H:%M:%S')}[/dim] {root}: {changed} updated, {removed} removed")
+
+            try:
+                watcher.run(on_change)
+            except KeyboardInterrupt:
+                console.print("\n[yellow]👋 Stopped watching.[/yellow]")
+    finally:
+        metrics.persist()
+
 @app.command()
 def config(
     action: str = typer.Argument(..., help="📋 Action: get or set."),
@@ -199,11 +554,66 @@ def config(
     else:
         console.print("[red]❌ Invalid action. Use 'get' or 'set'.[/red]")
 
+@app.command()
+def stats(
+    format: str = typer.Option("table", help="📄 Output format: table, json, or prometheus."),
+    reset: bool = typer.Option(False, help="🗑️  Clear the recorded metrics."),
+):
+    """
+    📈 Show where time goes across recorded research sessions.
+    """
+    import json
+    import metrics
+
+    if reset:
+        Path(metrics.METRICS_PATH).unlink(missing_ok=True)
+        console.print("[green]✅ Metrics cleared[/green]")
+        return
+
+    registry = metrics.load()
+    if format == "json":
+        print(json.dumps(registry.to_dict(), indent=2))
+        return
+    if format == "prometheus":
+        print(metrics.to_prometheus(registry), end="")
+        return
+    if format != "table":
+        console.print("[red]❌ Unsupported format.[/red]")
+        raise typer.Exit(1)
+
+    from rich.table import Table
+
+    if not registry.histograms:
+        console.print("[yellow]⚠️  No metrics recorded yet. Run some research first.[/yellow]")
+        return
+
+    stages = Table(title=f"📈 Stage timings ({registry.counters.get('sessions', 0):g} sessions)", title_justify="left")
+    for column in ("Stage", "Count", "Mean (ms)", "p50 (ms)", "p95 (ms)", "Total (s)"):
+        stages.add_column(column, justify="left" if column == "Stage" else "right", style="cyan" if column == "Stage" else None)
+    for name, h in sorted(registry.histograms.items(), key=lambda item: -item[1].total):
+        stages.add_row(
+            name, str(h.count), f"{h.total / h.count * 1000:.1f}",
+            f"≤{h.quantile(0.5) * 1000:g}", f"≤{h.quantile(0.95) * 1000:g}", f"{h.total:.2f}",
+        )
+    console.print(stages)
+
+    counters = Table(title="🔢 Counters", title_justify="left")
+    counters.add_column("Counter", style="cyan")
+    counters.add_column("Value", justify="right")
+    for name, value in sorted(registry.counters.items()):
+        if name.endswith(".hit"):
+            misses = registry.counters.get(name[:-4] + ".miss", 0)
+            counters.add_row(name[:-4] + ".hit_rate", f"{value / (value + misses):.0%}")
+        counters.add_row(name, f"{value:g}")
+    console.print(counters)
+
 @app.command()
 def status():
     """
     📊 Show system status and configuration.
     """
+    from rich.panel import Panel
+
     status_panel = Panel(
         f"[bold green]System Status[/bold green]\n\n"
         f"🔍 [cyan]Web Search:[/cyan] {'✅ Enabled' if True else '❌ Disabled'}\n"
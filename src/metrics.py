@@ -0,0 +1,180 @@
+"""Lightweight tracing and metrics.
+
+``span()`` times a stage into a session-wide histogram and, when a
+``trace()`` is active in the current context, into that query's trace as
+well. ``count()`` does the same for counters. Histograms use fixed
+buckets so they can be merged into the totals persisted by ``persist()``
+and read back by the ``stats`` command.
+"""
+import os
+import json
+import time
+import threading
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+METRICS_PATH = ".deep_research/metrics.json"
+BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf')]
+
+class Histogram:
+    def __init__(self, counts: Optional[List[int]] = None, total: float = 0.0):
+        self.counts = counts or [0] * len(BUCKETS)
+        self.total = total
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+
+    def merge(self, other: "Histogram"):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation."""
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= target and n:
+                return bound
+        return 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": self.counts, "sum": self.total}
+
+class Trace:
+    """Spans and counters recorded while handling one query."""
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, duration: float, attrs: Dict[str, Any]):
+        with self._lock:
+            self.spans.append({"name": name, "duration": duration, **attrs})
+
+    def add_count(self, name: str, value: float):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self) -> Dict[str, Any]:
+        stages: Dict[str, Dict[str, float]] = {}
+        for s in self.spans:
+            stage = stages.setdefault(s["name"], {"count": 0, "total": 0.0})
+            stage["count"] += 1
+            stage["total"] += s["duration"]
+        return {"stages": stages, "counters": dict(self.counters)}
+
+class Registry:
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).observe(value)
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, data: Dict[str, Any]):
+        with self._lock:
+            for name, value in data.get("counters", {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for name, h in data.get("histograms", {}).items():
+                # Only merge histograms recorded with the current bucket layout
+                if len(h["counts"]) == len(BUCKETS):
+                    self.histograms.setdefault(name, Histogram()).merge(Histogram(list(h["counts"]), h["sum"]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {name: h.to_dict() for name, h in self.histograms.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+REGISTRY = Registry()
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Dict[str, Any]]:
+    """Time a block. Yields a dict the block can add attributes to (e.g. token counts)."""
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        duration = time.perf_counter() - start
+        REGISTRY.observe(name, duration)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, duration, attrs)
+
+def count(name: str, value: float = 1):
+    REGISTRY.count(name, value)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_count(name, value)
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """Collect the spans and counters of everything run in this context (and contexts copied from it)."""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+def load(path: str = METRICS_PATH) -> Registry:
+    registry = Registry()
+    if Path(path).exists():
+        registry.merge(json.loads(Path(path).read_text()))
+    return registry
+
+def persist(path: str = METRICS_PATH):
+    """Add this session's metrics to the totals on disk and start counting afresh."""
+    session = REGISTRY.to_dict()
+    if not session["counters"] and not session["histograms"]:
+        return
+    totals = load(path)
+    totals.merge(session)
+    totals.count("sessions")
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    Path(tmp).write_text(json.dumps(totals.to_dict()))
+    os.replace(tmp, path)
+    REGISTRY.reset()
+
+def to_prometheus(registry: Registry) -> str:
+    lines = []
+    data = registry.to_dict()
+    for name, value in sorted(data["counters"].items()):
+        metric = "deep_research_" + name.replace(".", "_").replace("-", "_") + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    for name, h in sorted(data["histograms"].items()):
+        metric = "deep_research_" + name.replace(".", "_").replace("-", "_") + "_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, n in zip(BUCKETS, h["counts"]):
+            cumulative += n
+            le = "+Inf" if bound == float('inf') else repr(bound)
+            lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"{metric}_sum {h['sum']}")
+        lines.append(f"{metric}_count {cumulative}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,131 @@
+import time
+import threading
+import contextvars
+import concurrent.futures
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+from cache.cache import Cache
+import metrics
+
+NOISE_TAGS = ['script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'svg', 'iframe']
+
+def extract_main_text(html: str, max_chars: int = 20000) -> str:
+    """Main readable text of a page: the article/main element if any, minus navigation and boilerplate lines."""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+    root = soup.find('article') or soup.find('main') or soup.body or soup
+    lines = []
+    size = 0
+    for line in root.get_text("\n", strip=True).splitlines():
+        # Menus, buttons and bylines are short; keep lines that read like prose
+        if len(line.split()) < 5:
+            continue
+        lines.append(line)
+        size += len(line) + 1
+        if size >= max_chars:
+            break
+    return "\n".join(lines)[:max_chars]
+
+class PageFetcher:
+    """Fetches pages concurrently through one pooled session, with an on-disk conditional-request cache.
+
+    Pages fetched within ``fresh_for`` seconds are served from the cache
+    without a request; older ones are revalidated with If-None-Match /
+    If-Modified-Since, and a 304 reuses the cached text.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[Cache] = None,
+        max_workers: int = 8,
+        per_host: int = 2,
+        timeout: float = 10.0,
+        max_bytes: int = 2 * 1024 * 1024,
+        fresh_for: float = 3600,
+    ):
+        self.cache = cache or Cache(".deep_research/pages.db", max_entries=5000)
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.fresh_for = fresh_for
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = "Mozilla/5.0 (compatible; DeepResearchAgent/1.0)"
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max(per_host, max_workers))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _slots_for(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def _download(self, url: str, headers: Dict[str, str]) -> Tuple[requests.Response, Optional[str]]:
+        """The response and, for a 200 with a text content type, its body (at most ``max_bytes``) decoded."""
+        with self._slots_for(url), metrics.span("web.fetch.page"):
+            response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+            try:
+                content_type = response.headers.get('Content-Type', '').lower()
+                # Anything else is never used, so its body is never read
+                if response.status_code != 200 or not ('html' in content_type or content_type.startswith('text/')):
+                    return response, None
+                body = bytearray()
+                for chunk in response.iter_content(64 * 1024):
+                    body.extend(chunk)
+                    if len(body) >= self.max_bytes:
+                        break
+            finally:
+                response.close()
+        # Without a declared charset, UTF-8 is far likelier than requests' ISO-8859-1 default for text/*
+        encoding = (response.encoding if 'charset' in content_type else None) or 'utf-8'
+        try:
+            return response, bytes(body[:self.max_bytes]).decode(encoding, errors='replace')
+        except LookupError:
+            return response, bytes(body[:self.max_bytes]).decode('utf-8', errors='replace')
+
+    def fetch(self, url: str) -> Optional[str]:
+        cached = self.cache.get(url, ttl=float('inf'))
+        if cached and time.time() - cached['fetched'] < self.fresh_for:
+            return cached['content']
+
+        headers = {}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        try:
+            response, text = self._download(url, headers)
+            metrics.count(f"web.fetch.{response.status_code}")
+            if response.status_code == 304 and cached:
+                cached['fetched'] = time.time()
+                self.cache.set(url, cached)
+                return cached['content']
+            response.raise_for_status()
+            if text is None:
+                return None
+            content = extract_main_text(text) if 'html' in response.headers.get('Content-Type', '').lower() else text
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            # A stale copy beats nothing
+            return cached['content'] if cached else None
+
+        self.cache.set(url, {
+            'content': content,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched': time.time(),
+        })
+        return content
+
+    def fetch_many(self, urls: List[str]) -> Dict[str, Optional[str]]:
+        futures = [self._executor.submit(contextvars.copy_context().run, self.fetch, url) for url in urls]
+        return {url: future.result() for url, future in zip(urls, futures)}
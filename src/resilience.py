@@ -0,0 +1,92 @@
+import time
+import threading
+from collections import deque
+from typing import Deque, Dict, List
+import metrics
+
+class DeadlineExceeded(Exception):
+    """The query's latency budget ran out before a model answered."""
+
+class CircuitBreaker:
+    """Stops calling a model after ``failures`` consecutive failures, for ``cooldown`` seconds.
+
+    Once the cooldown has passed a single trial call is let through; success
+    closes the circuit again and failure re-opens it for another cooldown.
+    :meth:`available` only looks, :meth:`allow` claims that trial, so callers
+    ask ``allow`` right before the call and :meth:`release` a trial they end
+    up not making.
+    """
+
+    def __init__(self, failures: int = 3, cooldown: float = 30.0):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._failures: Dict[str, int] = {}
+        self._opened: Dict[str, float] = {}
+        self._trial: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def _ready(self, name: str) -> bool:
+        opened = self._opened.get(name)
+        if opened is None:
+            return True
+        return time.monotonic() - opened >= self.cooldown and not self._trial.get(name)
+
+    def available(self, name: str) -> bool:
+        """Whether a call to ``name`` would be let through, without claiming the trial."""
+        with self._lock:
+            return self._ready(name)
+
+    def allow(self, name: str) -> bool:
+        """Whether to call ``name`` now; a half-open circuit's single trial is claimed by the caller."""
+        with self._lock:
+            if not self._ready(name):
+                return False
+            if name in self._opened:
+                self._trial[name] = True
+            return True
+
+    def release(self, name: str):
+        """Give back a trial claimed by :meth:`allow` for a call that was never made or never finished."""
+        with self._lock:
+            self._trial.pop(name, None)
+
+    def success(self, name: str):
+        with self._lock:
+            self._failures.pop(name, None)
+            self._opened.pop(name, None)
+            self._trial.pop(name, None)
+
+    def failure(self, name: str):
+        with self._lock:
+            self._failures[name] = self._failures.get(name, 0) + 1
+            if self._trial.pop(name, False) or self._failures[name] >= self.failures:
+                if name not in self._opened:
+                    metrics.count(f"llm.breaker_open.{name}")
+                self._opened[name] = time.monotonic()
+
+    def state(self, name: str) -> str:
+        with self._lock:
+            if name not in self._opened:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened[name] >= self.cooldown else "open"
+
+class LatencyTracker:
+    """Recent call latencies per model, for picking when to hedge."""
+
+    def __init__(self, window: int = 200, min_samples: int = 10):
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self._window)).append(seconds)
+
+    def quantile(self, name: str, q: float, default: float) -> float:
+        """The q-th quantile of ``name``'s recent latencies, or ``default`` until there are enough samples."""
+        with self._lock:
+            samples: List[float] = sorted(self._samples.get(name, ()))
+        if len(samples) < self.min_samples:
+            return default
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
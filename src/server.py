@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import queue
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from base import AsyncAgent
+import metrics
+
+class Busy(Exception):
+    """The work queue is full."""
+
+class Flight:
+    """One research run and everyone waiting on it.
+
+    Events are kept, so a client that joins late still receives the whole
+    stream from the start.
+    """
+
+    def __init__(self, key: str, query: str, paths: List[str], max_results: int):
+        self.key = key
+        self.query = query
+        self.paths = paths
+        self.max_results = max_results
+        self.waiters = 1
+        self.summary: Optional[str] = None
+        self.error: Optional[str] = None
+        self.done = False
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._events: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+
+    def publish(self, event: Dict[str, Any]):
+        with self._cond:
+            self._events.append(event)
+            self._cond.notify_all()
+
+    def finish(self, summary: Optional[str] = None, error: Optional[str] = None):
+        with self._cond:
+            if self.done:
+                return
+            self.summary, self.error, self.done = summary, error, True
+            self.elapsed = time.perf_counter() - self.started
+            self._cond.notify_all()
+
+    def events(self, timeout: float) -> Iterator[Dict[str, Any]]:
+        """Every event published so far and then as it arrives, until the run finishes or ``timeout`` passes."""
+        deadline = time.monotonic() + timeout
+        seen = 0
+        while True:
+            with self._cond:
+                while seen == len(self._events) and not self.done:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError
+                    self._cond.wait(remaining)
+                pending, seen = self._events[seen:], len(self._events)
+                done = self.done
+            yield from pending
+            if done and seen == len(self._events):
+                return
+
+    def wait(self, timeout: float) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self.done, timeout)
+
+class ResearchService:
+    """Runs research for the HTTP server on warm, shared components.
+
+    Identical queries in flight share one run (single-flight), at most
+    ``concurrency`` runs execute at once and at most ``queue_size`` more wait;
+    beyond that :meth:`submit` raises :class:`Busy`.
+    """
+
+    def __init__(self, agent: AsyncAgent, roots: List[str], max_results: int = 5,
+                 concurrency: int = 4, queue_size: int = 32):
+        self.agent = agent
+        self.roots = roots
+        self.max_results = max_results
+        self.started = time.time()
+        self.counters = {"requests": 0, "coalesced": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._flights: Dict[str, Flight] = {}
+        self._queue: "queue.Queue[Optional[Flight]]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._running = 0
+        # The async LLM client is bound to one loop, so every run goes through this one
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="research-loop", daemon=True).start()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"research-worker-{i}", daemon=True)
+            for i in range(max(1, concurrency))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def resolve_paths(self, paths: Optional[List[str]]) -> List[str]:
+        """The requested roots, each of which must be one of the roots the server was started with.
+
+        Subdirectories are refused: each would become a new index shard, built
+        by a full scan on its first request.
+        """
+        if not paths:
+            return self.roots
+        if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+            raise ValueError("paths must be a list of strings")
+        served = {os.path.abspath(root): root for root in self.roots}
+        resolved = []
+        for path in paths:
+            root = served.get(os.path.abspath(path))
+            if root is None:
+                raise ValueError(f"path not served: {path}")
+            if root not in resolved:
+                resolved.append(root)
+        return resolved
+
+    def submit(self, query: str, paths: Optional[List[str]] = None, max_results: Optional[int] = None) -> Tuple[Flight, bool]:
+        """The flight researching ``query``, and whether it was already in flight."""
+        paths = self.resolve_paths(paths)
+        max_results = max_results or self.max_results
+        key = json.dumps([" ".join(query.lower().split()), sorted(os.path.abspath(p) for p in paths), max_results])
+        with self._lock:
+            self.counters["requests"] += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.counters["coalesced"] += 1
+                metrics.count("server.coalesced")
+                return flight, True
+            flight = Flight(key, query, paths, max_results)
+            try:
+                self._queue.put_nowait(flight)
+            except queue.Full:
+                self.counters["rejected"] += 1
+                metrics.count("server.rejected")
+                raise Busy from None
+            self._flights[key] = flight
+            return flight, False
+
+    def _work(self):
+        while True:
+            flight = self._queue.get()
+            if flight is None:
+                return
+            with self._lock:
+                self._running += 1
+            try:
+                asyncio.run_coroutine_threadsafe(self._run(flight), self.loop).result()
+            except Exception as e:
+                flight.finish(error=f"{type(e).__name__}: {e}")
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._flights.pop(flight.key, None)
+                    self.counters["failed" if flight.error else "completed"] += 1
+
+    async def _run(self, flight: Flight):
+        chunks = []
+        with metrics.span("server.research"):
+            async for chunk in self.agent.stream(flight.query, flight.paths, flight.max_results):
+                chunks.append(chunk)
+                flight.publish({"event": "token", "text": chunk})
+        flight.finish(summary="".join(chunks))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "queued": self._queue.qsize(),
+                "running": self._running,
+                "in_flight": len(self._flights),
+                "uptime": round(time.time() - self.started, 1),
+            }
+
+    def close(self):
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+def _handler(service: ResearchService, timeout: float, verbose: bool):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "DeepResearch/1.0"
+
+        def log_message(self, format, *args):
+            if verbose:
+                super().log_message(format, *args)
+
+        def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok", **service.stats()})
+            elif self.path.startswith("/stats"):
+                if "format=prometheus" in self.path:
+                    body = metrics.to_prometheus(metrics.REGISTRY).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                self._send_json(200, {"server": service.stats(), **metrics.REGISTRY.to_dict()})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/research":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not isinstance(request, dict):
+                    raise ValueError("request body must be a JSON object")
+                query = str(request.get("query", "")).strip()
+                if not query:
+                    raise ValueError("missing query")
+                max_results = request.get("max_results")
+                valid = isinstance(max_results, int) and not isinstance(max_results, bool) and 0 < max_results <= 50
+                if max_results is not None and not valid:
+                    raise ValueError("max_results must be an integer from 1 to 50")
+                flight, coalesced = service.submit(query, request.get("paths"), max_results)
+            except (ValueError, TypeError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            except Busy:
+                self._send_json(503, {"error": "server busy, retry later"}, {"Retry-After": "1"})
+                return
+
+            if request.get("stream"):
+                self._stream(flight, coalesced)
+                return
+            if not flight.wait(timeout):
+                self._send_json(504, {"error": "research timed out", "query": query})
+                return
+            status = 200 if flight.error is None else 500
+            self._send_json(status, {
+                "query": query,
+                "summary": flight.summary,
+                "error": flight.error,
+                "elapsed": round(flight.elapsed, 3),
+                "coalesced": coalesced,
+            })
+
+        def _stream(self, flight: Flight, coalesced: bool):
+            # Newline-delimited JSON events; the response ends when the connection closes
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            try:
+                for event in flight.events(timeout):
+                    self.wfile.write(json.dumps(event).encode() + b"\n")
+                    self.wfile.flush()
+                final = {"event": "done", "summary": flight.summary, "error": flight.error,
+                         "elapsed": round(flight.elapsed, 3), "coalesced": coalesced}
+            except TimeoutError:
+                final = {"event": "error", "error": "research timed out"}
+            except (BrokenPipeError, ConnectionResetError):
+                return  # The run carries on for anyone else waiting on it
+            try:
+                self.wfile.write(json.dumps(final).encode() + b"\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return Handler
+
+def create_server(service: ResearchService, host: str = "127.0.0.1", port: int = 8765,
+          timeout: float = 300.0, verbose: bool = False) -> ThreadingHTTPServer:
+    """Create the HTTP server; the caller runs ``serve_forever`` on it."""
+    httpd = ThreadingHTTPServer((host, port), _handler(service, timeout, verbose))
+    httpd.daemon_threads = True
+    return httpd
@@ -1,87 +1,457 @@
-from base import Summarizer
+from base import Summarizer, AsyncSummarizer
 from config import Config
-import re
+from cache.cache import Cache
+from context import CHARS_PER_TOKEN, estimate_tokens
+from resilience import CircuitBreaker, DeadlineExceeded, LatencyTracker
+import metrics
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import json
+import asyncio
+import hashlib
+import time
+import threading
+import contextvars
+import concurrent.futures
+
+BASE_URL = Config.VELOCITY_BASE_URL
+PRIMARY_MODEL = "openai.openai/gpt-5.2"
+FALLBACK_MODEL = "gpt-4"
+# Bump whenever prompts change so cached summaries from the old prompts stop matching
+PROMPT_VERSION = 1
+MAP_MAX_TOKENS = 300
+MODELS = (PRIMARY_MODEL, FALLBACK_MODEL)
+
+# Shared by every summarizer in the process, so one failing or slow upstream is learned about once
+BREAKER = CircuitBreaker(Config.LLM_BREAKER_FAILURES, Config.LLM_BREAKER_COOLDOWN)
+LATENCY = LatencyTracker()
 
 def get_client():
     import openai
     api_key = Config.get_velocity_api_key()
     if not api_key:
         return None
-    return openai.OpenAI(base_url="https://chat.velocity.online/api", api_key=api_key)
+    # Failover, hedging and deadlines are handled here; client-side retries would only eat the budget
+    return openai.OpenAI(base_url=BASE_URL, api_key=api_key, max_retries=0)
+
+def get_async_client():
+    import openai
+    api_key = Config.get_velocity_api_key()
+    if not api_key:
+        return None
+    return openai.AsyncOpenAI(base_url=BASE_URL, api_key=api_key, max_retries=0)
+
+def get_summary_cache() -> Cache:
+    return Cache(
+        ".deep_research/summary_cache.db",
+        max_entries=Config.SUMMARY_CACHE_MAX_ENTRIES,
+        max_age=Config.SUMMARY_CACHE_TTL,
+    )
+
+def _summary_key(text: str, query: str, depth: str) -> str:
+    # No model in the key: the answer is looked up before it is known which model will write it, and
+    # hedging or failover may pick either. A fallback model's answer is served like the primary's.
+    normalized = " ".join(text.split())
+    key_data = [normalized, " ".join(query.lower().split()), depth, PROMPT_VERSION]
+    return hashlib.sha256(json.dumps(key_data).encode()).hexdigest()
+
+def _chunk_text(text: str, chunk_tokens: int) -> List[str]:
+    """Split text into chunks of at most ``chunk_tokens``, breaking on line boundaries where possible."""
+    limit = chunk_tokens * CHARS_PER_TOKEN
+    chunks, current, size = [], [], 0
+    for line in text.splitlines(keepends=True):
+        # A single overlong line is cut into budget-sized pieces
+        pieces = [line[i:i + limit] for i in range(0, len(line), limit)] or [line]
+        for piece in pieces:
+            if size + len(piece) > limit and current:
+                chunks.append("".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+def _map_prompt(chunk: str, query: str) -> str:
+    return (f"Extract the key findings relevant to '{query}' from this part of the research data, "
+            f"as short bullet points. Keep sources' names where given: {chunk}")
+
+def _build_prompt(depth: str, text: str, query: str) -> Tuple[str, int]:
+    if depth == "light":
+        return f"Summarize the following research data briefly about '{query}': {text}", 100
+    elif depth == "standard":
+        return f"Summarize the following research data with key findings about '{query}': {text}", 200
+    elif depth == "deep":
+        return (f"Provide a detailed analysis of the following research data about '{query}', "
+                f"including claims, evidence, and conclusions: {text}"), 500
+    return f"Summarize the following research data about '{query}': {text}", 1500
+
+def _messages(model: str, prompt: str, max_tokens: int) -> List[Dict[str, str]]:
+    if model == PRIMARY_MODEL:
+        system = (
+            "You are a research summarization assistant for a CLI tool. "
+            "Produce a clear, well-structured summary that is easy to scan. "
+            "Use Markdown with short headings and bullet points. "
+            f"Keep it concise (3–6 sentences total, max tokens {max_tokens}). "
+            "Only use information present in the provided sources; do not invent details. "
+            "If evidence is weak or missing, say so explicitly."
+        )
+    else:
+        system = "You are a helpful assistant that summarizes research data."
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+    ]
+
+def _extractive(text: str, query: str, depth: str) -> str:
+    # Offline fallback, used when no API key is configured or every model call failed
+    import extractive  # Pulls in NumPy, so only loaded when actually needed
+    with metrics.span("summarize.extractive"):
+        return extractive.summarize(text, query, num_sentences=5 if depth == "deep" else 3)
+
+def _available_models() -> List[str]:
+    # Only looks at the circuits; a half-open model's trial is claimed when it is actually called
+    models = [model for model in MODELS if BREAKER.available(model)]
+    if not models:
+        raise RuntimeError("every model is failing, circuit open")
+    return models
+
+def _remaining(deadline: float) -> float:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        metrics.count("llm.deadline_exceeded")
+        raise DeadlineExceeded("summarization budget exhausted")
+    return remaining
+
+def _record_usage(model: str, usage) -> None:
+    metrics.count("llm.calls")
+    metrics.count(f"llm.calls.{model}")
+    if usage is not None:
+        metrics.count("llm.prompt_tokens", usage.prompt_tokens or 0)
+        metrics.count("llm.completion_tokens", usage.completion_tokens or 0)
 
 class TextSummarizer(Summarizer):
-    def __init__(self, depth: str = "standard"):
+    """Summarizes with the remote model, map-reducing inputs larger than ``chunk_tokens``.
+
+    Each query gets ``budget`` seconds. The fallback model is asked as well
+    (a hedged request) once the primary has taken longer than the
+    ``hedge_quantile`` of its recent latencies, or as soon as it fails; the
+    first answer wins. Models whose circuit is open are skipped, and when the
+    budget runs out the local extractive summary is returned instead.
+    """
+
+    def __init__(self, depth: str = "standard", cache: Optional[Cache] = None,
+                 chunk_tokens: Optional[int] = None, map_concurrency: Optional[int] = None,
+                 budget: Optional[float] = None, hedge_quantile: Optional[float] = None):
         self.client = get_client()
         self.depth = depth
+        self.cache = cache or get_summary_cache()
+        self.chunk_tokens = chunk_tokens or Config.SUMMARY_CHUNK_TOKENS
+        self.map_concurrency = map_concurrency or Config.SUMMARY_MAP_CONCURRENCY
+        self.budget = budget or Config.SUMMARY_BUDGET
+        self.hedge_quantile = hedge_quantile or Config.SUMMARY_HEDGE_QUANTILE
+        self._executor = None
+        self._calls = None
+        self._lock = threading.Lock()
+
+    def _call(self, model: str, prompt: str, max_tokens: int, timeout: float) -> str:
+        with metrics.span("llm.call", model=model):
+            started = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=_messages(model, prompt, max_tokens),
+                    max_tokens=max_tokens,
+                    timeout=timeout
+                )
+            except Exception:
+                metrics.count("llm.errors")
+                BREAKER.failure(model)
+                raise
+            BREAKER.success(model)
+            LATENCY.observe(model, time.perf_counter() - started)
+            _record_usage(model, getattr(response, 'usage', None))
+            return response.choices[0].message.content
+
+    def _complete(self, prompt: str, max_tokens: int, deadline: float) -> str:
+        models = _available_models()
+        with self._lock:
+            if self._calls is None:
+                # Separate from the map pool: map tasks block on these calls
+                self._calls = concurrent.futures.ThreadPoolExecutor(max_workers=32)
+        pending: Dict[concurrent.futures.Future, str] = {}
+        errors = []
+
+        def launch(model: str) -> bool:
+            timeout = _remaining(deadline)
+            if not BREAKER.allow(model):
+                return False  # Another caller holds its half-open trial
+            try:
+                future = self._calls.submit(contextvars.copy_context().run,
+                                            self._call, model, prompt, max_tokens, timeout)
+            except BaseException:
+                BREAKER.release(model)
+                raise
+            pending[future] = model
+            return True
+
+        primary = None
+        while models and primary is None:
+            model = models.pop(0)
+            if launch(model):
+                primary = model
+        if primary is None:
+            raise RuntimeError("every model is failing, circuit open")
+        hedges = models
+        hedge_at = time.monotonic() + LATENCY.quantile(primary, self.hedge_quantile, Config.SUMMARY_HEDGE_DELAY)
+        while pending or hedges:
+            if hedges and (not pending or time.monotonic() >= hedge_at):
+                hedging = bool(pending)
+                if launch(hedges.pop(0)) and hedging:
+                    metrics.count("llm.hedged")
+            if not pending:
+                continue
+            wake = min(deadline, hedge_at) if hedges else deadline
+            done, _ = concurrent.futures.wait(
+                pending, timeout=max(0.0, wake - time.monotonic()), return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                model = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(f"{model}: {e}")
+                    continue
+                if model != primary:
+                    metrics.count("llm.hedge_won")
+                return result
+            # Abandoned calls finish in the background, bounded by their own timeout
+            if pending and time.monotonic() >= deadline:
+                _remaining(deadline)
+        raise RuntimeError(", ".join(errors))
+
+    def _summarize_chunk(self, chunk: str, query: str, deadline: float) -> Tuple[str, bool]:
+        """The chunk's partial summary, and whether a model wrote it rather than the local fallback."""
+        try:
+            return self._complete(_map_prompt(chunk, query), MAP_MAX_TOKENS, deadline), True
+        except Exception as e:
+            print(f"Error in chunk summarization: {e}")
+            return _extractive(chunk, query, self.depth), False
+
+    def _reduce(self, text: str, query: str, deadline: float) -> Tuple[str, bool]:
+        """Map chunks concurrently, then repeat on the joined partial summaries until they fit one prompt.
+
+        Also returns whether every partial summary came from a model.
+        """
+        complete = True
+        while estimate_tokens(text) > self.chunk_tokens and time.monotonic() < deadline:
+            with self._lock:
+                # One pool per summarizer, so map_concurrency bounds every query sharing it together
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.map_concurrency)
+            chunks = _chunk_text(text, self.chunk_tokens)
+            # Each task runs in a copy of this context so its spans land in the caller's trace
+            futures = [
+                self._executor.submit(contextvars.copy_context().run, self._summarize_chunk, chunk, query, deadline)
+                for chunk in chunks
+            ]
+            partials = [future.result() for future in futures]
+            complete = complete and all(ok for _, ok in partials)
+            reduced = "\n".join(partial for partial, _ in partials)
+            if len(reduced) >= len(text):
+                break  # No progress; let the final prompt take what is left
+            text = reduced
+        return text, complete
 
     def summarize(self, text: str, query: str = "") -> str:
+        with metrics.span("summarize", depth=self.depth):
+            return self._summarize(text, query)
+
+    def _summarize(self, text: str, query: str) -> str:
         if self.client is None:
-            # Fallback to simple summarization
-            sentences = re.split(r'(?<=[.!?]) +', text)
-            summary_sentences = sentences[:3]  # First 3 sentences
-            return ' '.join(summary_sentences)
+            return _extractive(text, query, self.depth)
 
         if len(text) < 50:
             return text
 
-        try:
-            if self.depth == "light":
-                prompt = f"Summarize the following research data briefly about '{query}': {text}"
-                max_tokens = 100
-            elif self.depth == "standard":
-                prompt = f"Summarize the following research data with key findings about '{query}': {text}"
-                max_tokens = 200
-            elif self.depth == "deep":
-                prompt = f"Provide a detailed analysis of the following research data about '{query}', including claims, evidence, and conclusions: {text}"
-                max_tokens = 500
-            else:
-                prompt = f"Summarize the following research data about '{query}': {text}"
-                max_tokens = 1500
-
-            response = self.client.chat.completions.create(
-                model="openai.openai/gpt-5.2",
-                messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a research summarization assistant for a CLI tool. "
-                        "Produce a clear, well-structured summary that is easy to scan. "
-                        "Use Markdown with short headings and bullet points. "
-                        f"Keep it concise (3–6 sentences total, max tokens {max_tokens}). "
-                        "Only use information present in the provided sources; do not invent details. "
-                        "If evidence is weak or missing, say so explicitly."
-                    ),
-                },
-                {"role": "user", "content for research summarization ": prompt}
-                ],
-                max_tokens=max_tokens
-            )
-        
-            return response.choices[0].message.content
+        key = _summary_key(text, query, self.depth)
+        cached = self.cache.get(key, ttl=Config.SUMMARY_CACHE_TTL)
+        if cached is not None:
+            return cached
 
+        deadline = time.monotonic() + self.budget
+        try:
+            reduced, complete = self._reduce(text, query, deadline)
+            prompt, max_tokens = _build_prompt(self.depth, reduced, query)
+            summary = self._complete(prompt, max_tokens, deadline)
         except Exception as e:
-            # Try with gpt-4 if gpt-3.5 fails
+            print(f"Error in summarization: {e}")
+            return _extractive(text, query, self.depth)
+        # Built partly on extractive fallbacks; a later run may get every chunk from the model
+        if complete:
+            self.cache.set(key, summary)
+        return summary
+
+class AsyncTextSummarizer(AsyncSummarizer):
+    """Streams the model's answer token by token, with the same fallbacks as TextSummarizer.
+
+    Within the ``budget``, a model that yields no first token in time is
+    abandoned for the next one. Requests are not hedged, since only one
+    stream can be shown.
+    """
+
+    def __init__(self, depth: str = "standard", cache: Optional[Cache] = None,
+                 chunk_tokens: Optional[int] = None, map_concurrency: Optional[int] = None,
+                 budget: Optional[float] = None):
+        self.client = get_async_client()
+        self.depth = depth
+        self.cache = cache or get_summary_cache()
+        self.chunk_tokens = chunk_tokens or Config.SUMMARY_CHUNK_TOKENS
+        self.map_concurrency = map_concurrency or Config.SUMMARY_MAP_CONCURRENCY
+        self.budget = budget or Config.SUMMARY_BUDGET
+
+    async def _summarize_chunk(self, chunk: str, query: str, slots: asyncio.Semaphore,
+                               deadline: float) -> Tuple[str, bool]:
+        prompt = _map_prompt(chunk, query)
+        errors = []
+        async with slots:
             try:
-                response = self.client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant that summarizes research data."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=max_tokens
+                for model in _available_models():
+                    remaining = _remaining(deadline)
+                    if not BREAKER.allow(model):
+                        continue
+                    try:
+                        with metrics.span("llm.call", model=model):
+                            started = time.perf_counter()
+                            response = await asyncio.wait_for(self.client.chat.completions.create(
+                                model=model,
+                                messages=_messages(model, prompt, MAP_MAX_TOKENS),
+                                max_tokens=MAP_MAX_TOKENS,
+                                timeout=remaining
+                            ), remaining)
+                        BREAKER.success(model)
+                        LATENCY.observe(model, time.perf_counter() - started)
+                        _record_usage(model, getattr(response, 'usage', None))
+                        return response.choices[0].message.content, True
+                    except Exception as e:
+                        metrics.count("llm.errors")
+                        BREAKER.failure(model)
+                        errors.append(e)
+                    except asyncio.CancelledError:
+                        BREAKER.release(model)
+                        raise
+            except (RuntimeError, DeadlineExceeded) as e:
+                errors.append(e)
+        print(f"Error in chunk summarization: {', '.join(str(e) or type(e).__name__ for e in errors)}")
+        return _extractive(chunk, query, self.depth), False
+
+    async def _reduce(self, text: str, query: str, deadline: float) -> Tuple[str, bool]:
+        slots = asyncio.Semaphore(self.map_concurrency)
+        complete = True
+        while estimate_tokens(text) > self.chunk_tokens and time.monotonic() < deadline:
+            chunks = _chunk_text(text, self.chunk_tokens)
+            partials = await asyncio.gather(*(self._summarize_chunk(chunk, query, slots, deadline) for chunk in chunks))
+            complete = complete and all(ok for _, ok in partials)
+            reduced = "\n".join(partial for partial, _ in partials)
+            if len(reduced) >= len(text):
+                break
+            text = reduced
+        return text, complete
+
+    async def _stream_model(self, model: str, prompt: str, max_tokens: int, timeout: float) -> AsyncIterator[str]:
+        with metrics.span("llm.stream", model=model) as attrs:
+            try:
+                started = time.perf_counter()
+                stream = await self.client.chat.completions.create(
+                    model=model,
+                    messages=_messages(model, prompt, max_tokens),
+                    max_tokens=max_tokens,
+                    stream=True,
+                    timeout=timeout
                 )
-                return response.choices[0].message.content
-            except Exception as e2:
-                print(f"Error in summarization: {e}, {e2}")
-                # Fallback to simple summarization
-                sentences = re.split(r'(?<=[.!?]) +', text)
-                query_words = query.lower().split()
-                relevant_sentences = [s for s in sentences if any(word in s.lower() for word in query_words)]
-                
-                if not relevant_sentences:
-                    relevant_sentences = sentences
-
-                num_sentences = 5 if self.depth == "deep" else 3
-                summary_sentences = relevant_sentences[:num_sentences]
-
-                return ' '.join(summary_sentences)
\ No newline at end of file
+                chunks = 0
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if not chunks:
+                            attrs['first_token'] = time.perf_counter() - started
+                        chunks += 1
+                        yield chunk.choices[0].delta.content
+            except Exception:
+                metrics.count("llm.errors")
+                BREAKER.failure(model)
+                raise
+            except BaseException:
+                # Cancelled or closed by the consumer: no verdict on the model, but its trial is given back
+                BREAKER.release(model)
+                raise
+            BREAKER.success(model)
+            # Streamed responses carry no usage; each content chunk is roughly one token
+            attrs['completion_tokens'] = chunks
+            metrics.count("llm.calls")
+            metrics.count(f"llm.calls.{model}")
+            metrics.count("llm.prompt_tokens", estimate_tokens(prompt))
+            metrics.count("llm.completion_tokens", chunks)
+
+    async def stream(self, text: str, query: str = "") -> AsyncIterator[str]:
+        with metrics.span("summarize", depth=self.depth):
+            async for token in self._stream(text, query):
+                yield token
+
+    async def _stream(self, text: str, query: str) -> AsyncIterator[str]:
+        if self.client is None:
+            yield _extractive(text, query, self.depth)
+            return
+
+        if len(text) < 50:
+            yield text
+            return
+
+        key = _summary_key(text, query, self.depth)
+        cached = self.cache.get(key, ttl=Config.SUMMARY_CACHE_TTL)
+        if cached is not None:
+            yield cached
+            return
+
+        deadline = time.monotonic() + self.budget
+        # Only the final reduce step is streamed
+        reduced, complete = await self._reduce(text, query, deadline)
+        prompt, max_tokens = _build_prompt(self.depth, reduced, query)
+        errors = []
+        try:
+            models = _available_models()
+        except RuntimeError as e:
+            models, errors = [], [e]
+        for model in models:
+            try:
+                remaining = _remaining(deadline)
+            except DeadlineExceeded as e:
+                errors.append(e)
+                break
+            if not BREAKER.allow(model):
+                continue
+            tokens = []
+            stream = self._stream_model(model, prompt, max_tokens, remaining)
+            try:
+                # Until the first token arrives another model can still take over
+                try:
+                    tokens.append(await asyncio.wait_for(stream.__anext__(), remaining))
+                except asyncio.TimeoutError:
+                    BREAKER.failure(model)
+                    raise TimeoutError(f"{model}: no answer within the budget") from None
+                yield tokens[0]
+                async for token in stream:
+                    tokens.append(token)
+                    yield token
+                if complete:
+                    self.cache.set(key, "".join(tokens))
+                return
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                # Tokens already shown can't be taken back, so only fall through before the first one
+                if tokens:
+                    raise
+                errors.append(e)
+            finally:
+                await stream.aclose()
+        print(f"Error in summarization: {', '.join(str(e) for e in errors)}")
+        yield _extractive(text, query, self.depth)
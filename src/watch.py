@@ -0,0 +1,121 @@
+import os
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Set
+from file_search import FileSearcher, EXTENSIONS
+from config import Config
+
+HEARTBEAT = 10.0  # Seconds between marking watched shards fresh, well under any sensible rescan interval
+
+class _Changes:
+    """File system events for one root, collected between two applies."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.root_abs = os.path.abspath(root)
+        self.paths: Set[str] = set()
+        self.rescan = False
+        self._lock = threading.Lock()
+
+    def _index_path(self, event_path: str) -> Optional[str]:
+        relative = os.path.relpath(os.path.abspath(event_path), self.root_abs)
+        if relative.startswith(os.pardir) or not relative.endswith(EXTENSIONS):
+            return None
+        # Hidden files and directories are never indexed
+        if any(part.startswith('.') for part in relative.split(os.sep)):
+            return None
+        # Spelled the way FileSearcher stores it: under the absolute root
+        return os.path.join(self.root_abs, relative)
+
+    def dispatch(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        with self._lock:
+            if event.is_directory:
+                # A removed or renamed directory takes its files with it; no per-file events are promised
+                if event.event_type in ("deleted", "moved"):
+                    self.rescan = True
+                return
+            for event_path in (event.src_path, getattr(event, "dest_path", "")):
+                path = self._index_path(os.fsdecode(event_path)) if event_path else None
+                if path:
+                    self.paths.add(path)
+
+    def drain(self):
+        with self._lock:
+            paths, rescan = self.paths, self.rescan
+            self.paths, self.rescan = set(), False
+        return paths, rescan
+
+class Watcher:
+    """Applies file creates, modifies and deletes under ``roots`` to their index shards as they happen.
+
+    Uses watchdog (inotify on Linux) when it is installed, applying collected
+    events every ``interval`` seconds, and rescans every root in full every
+    ``reconcile_interval`` seconds so a dropped event is caught eventually.
+    Without watchdog it falls back to a full scan every ``poll_interval``
+    seconds.
+    """
+
+    def __init__(self, searcher: FileSearcher, roots: List[str], interval: float = 2.0,
+                 poll_interval: Optional[float] = None, reconcile_interval: Optional[float] = None):
+        self.searcher = searcher
+        self.roots = roots
+        self.interval = interval
+        self.poll_interval = poll_interval or Config.INDEX_POLL_INTERVAL
+        self.reconcile_interval = reconcile_interval or Config.INDEX_RESCAN_INTERVAL
+        self.mode = "polling"
+        self._changes: Dict[str, _Changes] = {}
+        self._observer = None
+        self._stop = threading.Event()
+        try:
+            from watchdog.observers import Observer
+            observer = Observer()
+            for root in roots:
+                changes = _Changes(root)
+                observer.schedule(changes, changes.root_abs, recursive=True)
+                self._changes[root] = changes
+            observer.start()
+            self._observer = observer
+            self.mode = "events"
+        except ImportError:
+            pass
+        except OSError as e:
+            # e.g. the inotify watch limit; polling still works
+            print(f"File system events unavailable ({e}), polling instead")
+            self._changes = {}
+
+    def run(self, on_change: Optional[Callable[[str, int, int], None]] = None):
+        """Apply changes until :meth:`stop` is called. ``on_change`` gets the root and its changed and removed counts."""
+        last_heartbeat = last_reconcile = time.monotonic()
+        try:
+            while not self._stop.wait(self.interval if self._observer is not None else self.poll_interval):
+                # Events can be dropped (e.g. an inotify queue overflow), so events mode also rescans now and then
+                reconcile = self._observer is not None and time.monotonic() - last_reconcile >= self.reconcile_interval
+                if reconcile:
+                    last_reconcile = time.monotonic()
+                for root in self.roots:
+                    if self._observer is None:
+                        counts = self.searcher.refresh(root)
+                    else:
+                        paths, rescan = self._changes[root].drain()
+                        if rescan or reconcile:
+                            counts = self.searcher.refresh(root)
+                        elif paths:
+                            counts = self.searcher.update(root, paths)
+                        else:
+                            continue
+                    if on_change and any(counts):
+                        on_change(root, *counts)
+                if self._observer is not None and time.monotonic() - last_heartbeat >= HEARTBEAT:
+                    # Every change is being applied, so searches elsewhere need not rescan these roots
+                    for root in self.roots:
+                        self.searcher.mark_fresh(root)
+                    last_heartbeat = time.monotonic()
+        finally:
+            if self._observer is not None:
+                self._observer.stop()
+                self._observer.join()
+
+    def stop(self):
+        self._stop.set()
@@ -1,11 +1,30 @@
-from ddgs import DDGS
 from base import Searcher
 from typing import List, Dict, Any
+from itertools import chain, zip_longest
+import contextvars
+import threading
+import concurrent.futures
 from cache.cache import Cache
+from dedup import dedup_results
+import metrics
+
+VARIANT_TEMPLATES = ["{query}", "{query} overview", "{query} explained", "\"{query}\"", "{query} research", "{query} examples"]
+
+def expand_query(query: str, count: int) -> List[str]:
+    """The query itself followed by up to ``count - 1`` rephrasings that widen recall."""
+    return [template.format(query=query) for template in VARIANT_TEMPLATES[:max(1, count)]]
 
 class WebSearcher(Searcher):
-    def __init__(self):
+    def __init__(self, fetch_pages: int = 0, fanout: int = 1):
         self.cache = Cache()
+        # Number of top-ranked results whose full page text is fetched; 0 keeps snippets only
+        self.fetch_pages = fetch_pages
+        # Number of query variants searched concurrently and merged
+        self.fanout = fanout
+        self._fetcher = None
+        self._executor = None
+        # research-batch shares one searcher across threads; the lazily built helpers are created once
+        self._lock = threading.Lock()
 
     def _rank_source(self, url: str) -> int:
         # Simple ranking: higher for reputable domains
@@ -19,15 +38,54 @@ class WebSearcher(Searcher):
             return 6
         return 5  # Default
 
+    def _fetch_pages(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not self.fetch_pages or not results:
+            return results
+        with self._lock:
+            if self._fetcher is None:
+                from page_fetch import PageFetcher
+                self._fetcher = PageFetcher()
+        with metrics.span("web.fetch", pages=min(self.fetch_pages, len(results))):
+            pages = self._fetcher.fetch_many([r['link'] for r in results[:self.fetch_pages]])
+        for r in results:
+            if pages.get(r['link']):
+                r['content'] = pages[r['link']]
+        return results
+
+    def _search_variants(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.fanout)
+        variants = expand_query(query, self.fanout)
+        futures = [
+            self._executor.submit(contextvars.copy_context().run, self._search, variant, max_results)
+            for variant in variants
+        ]
+        per_variant = [future.result() for future in futures]
+        # Interleave so each variant's best hits come before any variant's tail, then re-rank stably
+        merged = [r for r in chain.from_iterable(zip_longest(*per_variant)) if r is not None]
+        merged.sort(key=lambda r: self._rank_source(r['link']), reverse=True)
+        return dedup_results(merged)[:max_results]
+
     def search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        with metrics.span("web.search", fanout=self.fanout):
+            if self.fanout > 1:
+                results = self._search_variants(query, max_results)
+            else:
+                results = self._search(query, max_results)
+            # Page contents have their own cache with conditional revalidation, so fetch after the lookup
+            return self._fetch_pages(results)
+
+    def _search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         # Check cache first
         cached = self.cache.get(query, {"region": "en-us", "max_results": max_results})
         if cached:
             return cached
 
         try:
+            from ddgs import DDGS  # Heavy import, only paid on the first uncached search
             results = []
-            with DDGS() as ddgs:
+            with metrics.span("web.ddg"), DDGS() as ddgs:
                 for r in ddgs.text(query, region='en-us', max_results=max_results * 2):  # Fetch more for ranking
                     results.append({
                         'title': r['title'],